@@ -1,29 +1,41 @@
 import chainlit as cl
-import asyncio
-import nest_asyncio
-from langchain.callbacks.base import BaseCallbackHandler
-from llmAgents.query_agent import query_agent
-from constants.vectorStore import vector_store, memory, retriever
-from agents import Runner
+from llmAgents.streaming import stream_answer
+from llmAgents.semantic_pipeline import complete_prompt
+from services.request_context import current_request_context, request_scope
+from services.deadline import DeadlineExceeded, degraded_answer, iterate_with_deadline
+from services.conversation_memory import conversation_store
+from services.llm_limits import llm_slot
+from constants.resources import warm_up
 from constants.llms import models
-
-nest_asyncio.apply()
-
-# ✅ Optional streaming handler
-class ChainlitStreamHandler(BaseCallbackHandler):
-    def __init__(self):
-        self.msg = None
-
-    async def on_llm_start(self, *args, **kwargs):
-        self.msg = await cl.Message(content="").send()
-
-    async def on_llm_new_token(self, token: str, *args, **kwargs):
-        if self.msg:
-            await self.msg.stream_token(token)
-
-    async def on_llm_end(self, *args, **kwargs):
-        if self.msg:
-            await self.msg.update()
+from services.tracing import configure_logging
+
+# Everything below runs on the server's shared event loop: blocking work goes
+# to threads and LLM calls are awaited, so one slow call never stalls other users.
+configure_logging()
+# Load the index, models and connections in the background at server start
+warm_up()
+
+async def stream_to_message(query: str, agent_input) -> str:
+    """Stream answer tokens into one Chainlit message and tool calls into steps."""
+    msg = cl.Message(content="")
+    step = None
+    answer_text = ""
+    async for event in stream_answer(query, agent_input):
+        if event.kind == "progress":
+            if step is not None:
+                await step.update()
+            step = cl.Step(name=event.text, type="tool")
+            await step.send()
+        elif event.kind == "token":
+            await msg.stream_token(event.text)
+        else:
+            answer_text = event.text
+    if step is not None:
+        await step.update()
+    if not msg.content:
+        msg.content = answer_text
+    await msg.send()
+    return answer_text
 
 # 🧠 Simple heuristic to decide if it's a new query or follow-up
 def is_new_query(user_query: str, prev_query: str | None) -> bool:
@@ -37,9 +49,7 @@ def is_new_query(user_query: str, prev_query: str | None) -> bool:
 @cl.on_chat_start
 async def start_chat():
     """Initialize session state for each new user session."""
-    cl.user_session.set("vector_store", vector_store)
-    cl.user_session.set("retriever", retriever)
-    cl.user_session.set("memory", memory)
+    cl.user_session.set("memory", conversation_store.get(cl.user_session.get("id")))
     cl.user_session.set("last_query", None)  # Track previous main query
 
     await cl.Message(
@@ -49,7 +59,6 @@ async def start_chat():
 @cl.on_message
 async def handle_message(message: cl.Message):
     user_query = message.content.strip()
-    retriever = cl.user_session.get("retriever")
     memory = cl.user_session.get("memory")
     last_query = cl.user_session.get("last_query")
 
@@ -66,7 +75,6 @@ async def handle_message(message: cl.Message):
     # 🟡 NEW QUERY SECTION
     # -------------------------
     if new_query_flag:
-        await cl.Message(content="🤔 Thinking...").send()
         system_message = [
             {
                 "role": "system",
@@ -81,14 +89,13 @@ async def handle_message(message: cl.Message):
         ]
 
         try:
-            response = await Runner.run(query_agent, system_message)
-            answer_text = str(response.final_output)
+            with request_scope(user_query):
+                answer_text = await stream_to_message(user_query, system_message)
         except Exception as e:
             await cl.Message(content=f"❌ Error: {e}").send()
             return
 
-        await cl.Message(content=answer_text).send()
-        memory.save_context({"input": user_query}, {"output": answer_text})
+        await memory.asave_context({"input": user_query}, {"output": answer_text})
         cl.user_session.set("last_query", user_query)  # 📝 update last query
         return
 
@@ -96,8 +103,17 @@ async def handle_message(message: cl.Message):
     # 🟢 FOLLOW-UP SECTION
     # -------------------------
     try:
-        history_docs = retriever.invoke(user_query)
-        history_text = "\n".join([doc.page_content for doc in history_docs])
+        with request_scope(user_query):
+            answer_text = await answer_follow_up(user_query, memory)
+    except Exception as e:
+        await cl.Message(content=f"❌ Error: {e}").send()
+        return
+    await memory.asave_context({"input": user_query}, {"output": answer_text})
+
+
+async def answer_follow_up(user_query: str, memory) -> str:
+    try:
+        history_text = await memory.ahistory_text(user_query)
     except Exception as e:
         await cl.Message(content=f"⚠️ Context retrieval failed: {e}").send()
         history_text = ""
@@ -114,8 +130,7 @@ async def handle_message(message: cl.Message):
         {history_text}
         """
         msg = await cl.Message(content="📝 Summarizing...").send()
-        summary = models.gemini_llm.invoke(summary_prompt)
-        answer_text = summary.content
+        answer_text = await complete_prompt(summary_prompt, "summary")
         await msg.remove()
         await cl.Message(content=answer_text).send()
 
@@ -131,10 +146,18 @@ async def handle_message(message: cl.Message):
         Follow-up Question:
         {user_query}
         """
-        msg = await cl.Message(content="🤔 Thinking...").send()
-        result = models.gemini_llm.invoke(follow_prompt)
-        answer_text = result.content.strip()
-        await msg.remove()
-        await cl.Message(content=answer_text).send()
-
-    memory.save_context({"input": user_query}, {"output": answer_text})
+        msg = cl.Message(content="")
+        try:
+            async with llm_slot("gemini"):
+                async for chunk in iterate_with_deadline(models.gemini_llm.astream(follow_prompt), "follow_up"):
+                    await msg.stream_token(chunk.content)
+        except DeadlineExceeded:
+            # Keep the partial reply, or fall back to the degraded answer
+            if msg.content:
+                current_request_context().degrade("follow_up_cut")
+            else:
+                await msg.stream_token(degraded_answer())
+        await msg.send()
+        answer_text = msg.content.strip()
+
+    return answer_text
@@ -1,37 +1,39 @@
 import streamlit as st
-import asyncio
 import nest_asyncio
-from langchain.callbacks.streamlit import StreamlitCallbackHandler
-from llmAgents.query_agent import query_agent
-from langchain.memory import VectorStoreRetrieverMemory, ConversationBufferMemory
-from services.mongo_tool import vector_store
-from agents import Runner
-from services.refining_agent import refine_response_with_gemini
-from agents.run import RunConfig
-import json
+from llmAgents.streaming import stream_answer
+from langchain.memory import ConversationBufferMemory
+from services.conversation_memory import conversation_store
+from constants.resources import warm_up
+from services.refining_agent import refinement_fell_back, stream_refinement
+from constants.connection.neo4j_connection import connection
+from services.answer_cache import cache_answer
+from services.token_budget import token_metrics
+from services.tracing import configure_logging
+from services.request_context import request_scope
+import logging
+import uuid
 
 nest_asyncio.apply()
+configure_logging()
+logger = logging.getLogger(__name__)
 st.set_page_config(page_title="News Knowledge Agent", page_icon="📰", layout="wide")
 st.title("📰 News Knowledge Agent")
 
-# ✅ Initialize vector store & memory
-retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-memory = VectorStoreRetrieverMemory(retriever=retriever, memory_key="chat_history")
-memory_1 = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-
-
-if "vector_store" not in st.session_state:
-    with st.spinner("Creating vector store..."):
-        st.session_state.vector_store = vector_store
-        st.session_state.retriever = retriever
-        st.session_state.memory = memory
-        st.session_state.memory_1 = memory_1  
-    print("✅ Vector store and memory initialized successfully!")
-else:
-    vector_store = st.session_state.vector_store
-    retriever = st.session_state.retriever
-    memory = st.session_state.memory
-    memory_1 = st.session_state.memory_1
+# ✅ Load the index, models and connections in the background while the page renders
+warm_up()
+
+if "memory_1" not in st.session_state:
+    st.session_state.memory_1 = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+memory_1 = st.session_state.memory_1
+
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+
+
+def get_memory():
+    """Conversation memory of this session, separate from the article index."""
+    return conversation_store.get(st.session_state.session_id)
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -50,16 +52,46 @@ user_input = st.chat_input("Ask a question or follow up...")
 memory_1_history_messages = memory_1.load_memory_variables({})['chat_history']
 
 
+async def render_stream(query: str, system_message, history_text: str, status, placeholder):
+    """Render streamed answer tokens into `placeholder` and tool progress into `status`."""
+    answer_text, response = "", None
+    async for event in stream_answer(query, system_message, history_text, cache=False):
+        if event.kind == "progress":
+            status.update(label=event.text)
+            status.write(event.text)
+        elif event.kind == "token":
+            answer_text += event.text
+            placeholder.markdown(answer_text + "▌")
+        else:
+            answer_text, response = event.text, event.response
+    placeholder.markdown(answer_text)
+    return answer_text, response
+
+
+async def render_refinement(query: str, answer_text: str, summaries: list, placeholder) -> str:
+    """Stream the refined answer over the draft in `placeholder`."""
+    refined = ""
+    async for token in stream_refinement(query, answer_text, summaries):
+        refined += token
+        placeholder.markdown(refined + "▌")
+    refined = refined.strip() or answer_text
+    if refinement_fell_back():
+        refined = answer_text
+    placeholder.markdown(refined)
+    return refined
+
+
 def handle_query(query: str):
+    memory = get_memory()
     st.session_state.messages.append({"role": "user", "content": query})
     with st.chat_message("user"):
         st.markdown(query)
 
     history_text = ""
+    relevant_context = []
     try:
-        
-        relevant_context = memory.retriever.invoke(query)
-        history_text = "\n".join([doc.page_content for doc in relevant_context])
+        relevant_context = memory.relevant_history(query)
+        history_text = "\n".join(relevant_context)
 
 
     except Exception as e:
@@ -78,23 +110,24 @@ def handle_query(query: str):
     else:
         system_message = query
 
-    with st.spinner("Thinking..."):
-        st_callback_container = st.container()
-        st_callback = StreamlitCallbackHandler(st_callback_container)
-        response = asyncio.run(Runner.run(query_agent, system_message))
-        answer_text = str(response.final_output)
-        print("Using refining agent to improve the answer...")
-        refined_answer = refine_response_with_gemini(query, answer_text)
-        print("Used refining agent successfully.")
-
-    print("relevant_context----------------\n", relevant_context)
-    print("memory_1_history_messages----------------\n", memory_1_history_messages)
-    for r in response.raw_responses:
-        print("🧾 Token usage:\n", r.usage)
-    print("agent thoughts----------------\n", answer_text)
-    
-    with st.chat_message("assistant"):
-        st.markdown(refined_answer)
+    with st.chat_message("assistant"), request_scope(query) as ctx:
+        # ✅ Show tool progress and answer tokens as they arrive
+        status = st.status("Thinking...")
+        placeholder = st.empty()
+        answer_text, response = connection.run(render_stream(query, system_message, history_text, status, placeholder))
+        status.update(label="Refining answer...")
+        if ctx.cached:
+            # Cached answers were refined when they were first produced
+            refined_answer = answer_text
+        else:
+            refined_answer = connection.run(render_refinement(query, answer_text, ctx.summaries, placeholder))
+            cache_answer(query, refined_answer, history_text)
+        status.update(label="Done", state="complete")
+    # The per-stage breakdown is logged by services.tracing when the request scope ends
+    logger.info("🧾 Token usage: %s | per request: %s", ctx.tokens, token_metrics.snapshot()["per_request"])
+    logger.debug("relevant_context: %s", relevant_context)
+    logger.debug("memory_1_history_messages: %s", memory_1_history_messages)
+    logger.debug("agent thoughts: %s", answer_text)
 
     st.session_state.messages.append({"role": "assistant", "content": refined_answer})
     st.session_state.last_response = answer_text
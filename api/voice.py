@@ -1,34 +1,31 @@
-from agents import Runner
-import whisper
-from io import BytesIO
 import streamlit as st
-import asyncio
+import uuid
 import nest_asyncio
 from langchain.callbacks.streamlit import StreamlitCallbackHandler
-from llmAgents.query_agent import query_agent
-import numpy as np
-import soundfile as sf
-from constants.llms import models
-from langchain.memory import VectorStoreRetrieverMemory
-from services.mongo_tool import vector_store
+from llmAgents.semantic_pipeline import answer_query, complete_prompt
+from services.request_context import request_scope
+from constants.connection.neo4j_connection import connection
+from services.conversation_memory import conversation_store
+from constants.resources import warm_up
+from services.tracing import configure_logging
+from services.transcription import transcriber
 
 nest_asyncio.apply()
+configure_logging()
 st.set_page_config(page_title="News Knowledge Agent", page_icon="📰", layout="wide")
 st.title("News Knowledge Agent")
 
-# ✅ Initialize vector store & memory
-retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-memory = VectorStoreRetrieverMemory(retriever=retriever, memory_key="chat_history")
-if "vector_store" not in st.session_state:
-    with st.spinner("Creating vector store..."):
-        st.session_state.vector_store = vector_store
-        st.session_state.retriever = retriever
-        st.session_state.memory = memory
-    st.success("✅ Vector store and memory initialized successfully!")
-else:
-    vector_store = st.session_state.vector_store
-    retriever = st.session_state.retriever
-    memory = st.session_state.memory
+# ✅ Load the index, models and connections in the background while the page renders
+warm_up()
+
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+
+
+def get_memory():
+    """Conversation memory of this session, separate from the article index."""
+    return conversation_store.get(st.session_state.session_id)
 
 if "messages" not in st.session_state:
     st.session_state.messages = [] 
@@ -45,26 +42,35 @@ if st.session_state.messages:
             st.markdown(f"**🤖 Assistant:** {msg['content']}")
 
 st.markdown("---")
-@st.cache_resource
-def load_whisper_model():
-    return whisper.load_model("base")  # tiny/base/small/medium/large
-
-whisper_model = load_whisper_model()
-
-def transcribe_audio_in_memory(audio_file, model):
+def transcribe_audio_in_memory(audio_file, slot: str):
+    """
+    Transcript of a recorded clip, and whether this is the first time it is
+    final for `slot` (the main query or follow-up recorder). The clip is
+    transcribed once on the background pool, with partial transcripts shown
+    as its chunks finish; reruns with the same recording read the cached text.
+    """
     if audio_file is None:
-        return None
+        return None, False
+    job = transcriber.submit(audio_file.getvalue())
+    if not job.done():
+        bar = st.progress(0.0, text="🎧 Transcribing...")
+        partial = st.empty()
+        while not job.wait(0.2):
+            if job.progress is not None:
+                bar.progress(job.progress, text=f"🎧 Transcribing... {job.progress:.0%}")
+            if job.partial_text():
+                partial.markdown(f"_{job.partial_text()}..._")
+        bar.empty()
+        partial.empty()
     try:
-        audio_bytes = audio_file.read()
-        audio_np, sr = sf.read(BytesIO(audio_bytes))  # Read as np.ndarray
-        if audio_np.dtype != np.float32:
-            audio_np = audio_np.astype(np.float32)
-        result = model.transcribe(audio_np, fp16=False)
-        st.write(result["text"])
-        return result["text"].strip()
+        text = job.result()
     except Exception as e:
         st.error(f"Audio transcription failed: {e}")
-        return None
+        return None, False
+    st.write(text)
+    fresh = st.session_state.get(f"voice_{slot}") != job.key
+    st.session_state[f"voice_{slot}"] = job.key
+    return text, fresh
 with st.container():
     st.subheader("Ask your main query")
     col1, col2 = st.columns(2)
@@ -76,12 +82,13 @@ with st.container():
         audio_file = st.audio_input("🎤 record your query:")
 
 
-    audio_text = transcribe_audio_in_memory(audio_file, whisper_model)
+    audio_text, new_recording = transcribe_audio_in_memory(audio_file, "main")
     # Determine final input (text has priority)
     user_query = user_text.strip() or (audio_text or "").strip()
+    # A new voice query is answered as soon as its transcript is final
+    voice_submit = new_recording and not user_text.strip()
 
-
-    if st.button("Submit Query") and user_query.strip():
+    if (st.button("Submit Query") or voice_submit) and user_query.strip():
         st.session_state.messages.append({"role": "user", "content": user_query})
 
         system_message = [
@@ -105,7 +112,8 @@ with st.container():
                 #      {"callbacks":[st_callback]},
                      
                 # )
-                response = asyncio.run(Runner.run(query_agent,system_message))
+                with request_scope(user_query):
+                    answer_text, _ = connection.run(answer_query(user_query, system_message))
             except Exception as e:
                 error_message = f"Sorry, an error occurred: {e}"
                 st.error(error_message)
@@ -115,11 +123,10 @@ with st.container():
                 st.stop()
 
         #answer_text = str(response["output"])
-        answer_text = str(response.final_output)
         st.session_state.messages.append({"role": "assistant", "content": answer_text})
         st.session_state.main_answered = True
 
-        memory.save_context({"input": user_query}, {"output": answer_text})
+        get_memory().save_context({"input": user_query}, {"output": answer_text})
         st.rerun()  
 
 def clear_followup():
@@ -135,12 +142,13 @@ if st.session_state.main_answered:
 
     followup_text = st.text_input("You (Type 'happy' to move on):", key="followup")
     audio_followup = st.audio_input("🎤 Or record follow-up:")
-    followup_transcript = transcribe_audio_in_memory(audio_followup, whisper_model)
+    followup_transcript, new_recording = transcribe_audio_in_memory(audio_followup, "followup")
     
 
     followup_query = followup_text.strip() or (followup_transcript or "").strip()
+    voice_submit = new_recording and not followup_text.strip()
 
-    if st.button("Submit Follow-up"):
+    if (st.button("Submit Follow-up") or voice_submit) and followup_query.strip():
         if followup_query.strip().lower() in ["happy", "exit", "quit", "bye"]:
             st.success("✅ Conversation ended. You can start a new main query above.")
             st.session_state.main_answered = False
@@ -152,8 +160,7 @@ if st.session_state.main_answered:
 
         history_text = ""
         try:
-            history_docs = retriever.invoke(followup_query)
-            history_text = "\n".join([doc.page_content for doc in history_docs])
+            history_text = get_memory().history_text(followup_query)
         except Exception as e:
             st.warning(f"Problem retrieving history: {e}")
 
@@ -169,9 +176,8 @@ if st.session_state.main_answered:
 
             {history_text}
             """
-            with st.spinner("Summarizing..."):
-                summary = models.gemini_llm.invoke(summary_prompt)
-            answer_text = summary.content
+            with st.spinner("Summarizing..."), request_scope(followup_query):
+                answer_text = connection.run(complete_prompt(summary_prompt, "summary"))
 
         else:
             prompt = f"""
@@ -183,12 +189,11 @@ if st.session_state.main_answered:
             Context: {history_text}
             Question: {followup_query}
             """
-            with st.spinner("Thinking..."):
-                result = models.gemini_llm.invoke(prompt)
-            answer_text = result.content.strip()
+            with st.spinner("Thinking..."), request_scope(followup_query):
+                answer_text = connection.run(complete_prompt(prompt, "follow_up"))
 
         
         st.session_state.messages.append({"role": "assistant", "content": answer_text})
 
-        memory.save_context({"input": followup_query}, {"output": answer_text})
+        get_memory().save_context({"input": followup_query}, {"output": answer_text})
         st.rerun() 
@@ -0,0 +1,391 @@
+"""
+Deterministic local stand-ins for the external services, for offline
+benchmarks: scripted LLMs with configurable latency, the `summaries`
+collection, the Author/Articles/Category graph, a synthetic article
+corpus indexed with hashed bag-of-words embeddings and the parts of
+Chainlit the chat handler uses.
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from services.cypher_templates import TEMPLATES
+
+TOPICS = [
+    "electric vehicles", "semiconductor chips", "climate policy", "cricket world cup", "cloud computing",
+    "interest rates", "space launch", "cyber security", "renewable energy", "artificial intelligence",
+    "smartphone launch", "stock market", "healthcare startups", "autonomous driving", "quantum computing",
+]
+CATEGORIES = ["technology", "business", "sports", "science", "politics"]
+AUTHORS = ["Asha Rao", "Ben Carter", "Chen Wei", "Dana Lopez", "Elif Kaya", "Farid Khan", "Grace Lee", "Hugo Martin"]
+FILLER = (
+    "report market growth company launch plan government data analysts investors users industry "
+    "deal quarter global region experts update product research team partners impact"
+).split()
+
+# The Cypher the fake generation chain returns for questions no template covers
+GENERATED_CYPHER = (
+    "MATCH (a:Author)-[:WROTE]->(b:Articles)-[:BELONGSTO]->(c:Category) "
+    "RETURN b.article_id AS article_id, b.title AS title, b.refLink AS refLink, "
+    "a.author AS author, c.category AS category LIMIT 10"
+)
+
+
+def _sleep_ms(ms: float):
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+
+async def _asleep_ms(ms: float):
+    if ms > 0:
+        await asyncio.sleep(ms / 1000)
+
+
+@dataclass
+class SyntheticCorpus:
+    """Articles with text, summary and graph properties, generated from a seed."""
+    articles: list
+
+    @classmethod
+    def generate(cls, size: int, seed: int = 0):
+        rng = random.Random(seed)
+        articles = []
+        for i in range(size):
+            topic = TOPICS[i % len(TOPICS)]
+            words = [rng.choice(FILLER) for _ in range(60)]
+            text = f"{topic.capitalize()} news {i}. " + " ".join(words[:30]) + f" {topic}. " + " ".join(words[30:]) + "."
+            articles.append({
+                "article_id": str(i),
+                "title": f"{topic.title()} update {i}",
+                "text": text,
+                "summary": f"Article {i} covers {topic}: " + " ".join(words[:20]) + ".",
+                "refLink": f"https://news.example/{i}",
+                "author": AUTHORS[i % len(AUTHORS)],
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "published": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            })
+        return cls(articles)
+
+    def documents(self) -> list:
+        return [
+            Document(page_content=a["text"], metadata={"article_id": a["article_id"], "title": a["title"]})
+            for a in self.articles
+        ]
+
+    def metadata(self) -> dict:
+        return {a["article_id"]: {"category": a["category"], "published": a["published"]} for a in self.articles}
+
+
+class HashEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors: deterministic, model-free, and similar for texts sharing words."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> list:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+
+class _Cursor:
+    def __init__(self, docs: list):
+        self._docs = docs
+
+    def max_time_ms(self, ms: int):
+        return self
+
+    def __iter__(self):
+        return iter(self._docs)
+
+
+class FakeSummaries:
+    """The `summaries` collection's `find` for the `article_id: {$in: ...}` lookups the tools make."""
+
+    def __init__(self, corpus: SyntheticCorpus, latency_ms: float = 5.0):
+        self.by_id = {a["article_id"]: a["summary"] for a in corpus.articles}
+        self.latency_ms = latency_ms
+
+    def find(self, filter: dict, projection: dict = None):
+        _sleep_ms(self.latency_ms)
+        ids = [str(a) for a in filter.get("article_id", {}).get("$in", [])]
+        return _Cursor([
+            {"article_id": int(a) if a.isdigit() else a, "summary": {"summary": self.by_id[a]}}
+            for a in ids if a in self.by_id
+        ])
+
+
+class InMemoryGraph:
+    """
+    Answers the Cypher templates and GENERATED_CYPHER over the synthetic
+    corpus, standing in for the `connection` class of the Neo4j tools.
+    """
+
+    def __init__(self, corpus: SyntheticCorpus, latency_ms: float = 5.0):
+        self.latency_ms = latency_ms
+        self.rows = [
+            {k: a[k] for k in ("article_id", "title", "refLink", "author", "category")}
+            for a in corpus.articles
+        ]
+        self._handlers = {
+            self._normalize(TEMPLATES["articles_by_ids"]): self._by_ids,
+            self._normalize(TEMPLATES["articles_by_author"]): self._by_author,
+            self._normalize(TEMPLATES["articles_by_category"]): self._by_category,
+            self._normalize(TEMPLATES["articles_by_author_and_category"]): self._by_author_and_category,
+            self._normalize(GENERATED_CYPHER): lambda params: self.rows[:10],
+        }
+
+    @staticmethod
+    def _normalize(cypher: str) -> str:
+        return " ".join(cypher.split())
+
+    def _by_ids(self, params):
+        ids = {str(a) for a in params.get("ids", [])}
+        return [r for r in self.rows if r["article_id"] in ids]
+
+    def _by_author(self, params):
+        return [r for r in self.rows if params["author"].lower() == r["author"].lower()]
+
+    def _by_category(self, params):
+        return [r for r in self.rows if r["category"] == params["category"]]
+
+    def _by_author_and_category(self, params):
+        return [r for r in self._by_author(params) if r["category"] == params["category"]]
+
+    def _run(self, cypher: str, params: dict = None) -> list:
+        handler = self._handlers.get(self._normalize(cypher))
+        return [dict(r) for r in handler(params or {})] if handler else []
+
+    def read(self, cypher: str, params: dict = None, timeout: float = None) -> list:
+        _sleep_ms(self.latency_ms)
+        return self._run(cypher, params)
+
+    def write(self, cypher: str, params: dict = None, timeout: float = None) -> list:
+        _sleep_ms(self.latency_ms)
+        return []
+
+    async def read_async(self, cypher: str, params: dict = None, timeout: float = None) -> list:
+        await _asleep_ms(self.latency_ms)
+        return self._run(cypher, params)
+
+
+@dataclass
+class FakeMessage:
+    content: str
+
+
+class FakeChatModel:
+    """LangChain chat model stand-in: a scripted reply after `latency_ms`, streamed in `chunks` pieces."""
+
+    def __init__(self, latency_ms: float = 50.0, reply: str = None, chunks: int = 8):
+        self.latency_ms = latency_ms
+        self.reply = reply
+        self.chunks = chunks
+
+    def _reply(self, prompt) -> str:
+        if self.reply is not None:
+            return self.reply
+        text = str(prompt)
+        return f"Here is what the articles report. {text[-200:].strip()}"
+
+    def invoke(self, prompt, *args, **kwargs):
+        _sleep_ms(self.latency_ms)
+        return FakeMessage(self._reply(prompt))
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        await _asleep_ms(self.latency_ms)
+        return FakeMessage(self._reply(prompt))
+
+    async def astream(self, prompt, *args, **kwargs):
+        reply = self._reply(prompt)
+        step = max(len(reply) // self.chunks, 1)
+        for start in range(0, len(reply), step):
+            await _asleep_ms(self.latency_ms / self.chunks)
+            yield FakeMessage(reply[start:start + step])
+
+
+class _FakeTextChain:
+    """A prompt | llm | StrOutputParser chain: replies with plain text."""
+
+    def __init__(self, latency_ms: float, reply: str):
+        self.latency_ms = latency_ms
+        self.reply = reply
+
+    async def ainvoke(self, inputs, *args, **kwargs):
+        await _asleep_ms(self.latency_ms)
+        return self.reply
+
+
+class FakeCypherChain:
+    """Stands in for GraphCypherQAChain's generation step, which `generate_cypher` calls."""
+
+    graph_schema = "Node properties: Author {author}, Articles {article_id, title, refLink}, Category {category}"
+
+    def __init__(self, latency_ms: float = 30.0, cypher: str = GENERATED_CYPHER):
+        self.cypher_generation_chain = _FakeTextChain(latency_ms, f"```cypher\n{cypher}\n```")
+
+
+def make_agent_model(latency_ms: float = 50.0, chunks: int = 8):
+    """
+    An Agents SDK Model that scripts the retrieval plan of `query_agent`:
+    mongo_tool first, then summary_tool and neo4j_tool on the returned IDs,
+    then a final answer built from the tool outputs. Streamed runs get the
+    same turns, with the answer text as `chunks` deltas.
+    """
+    from agents import ModelResponse, Usage
+    from agents.models.interface import Model
+    from openai.types.responses import (
+        Response, ResponseCompletedEvent, ResponseFunctionToolCall, ResponseOutputMessage, ResponseOutputText,
+        ResponseTextDeltaEvent, ResponseUsage,
+    )
+    from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+    def _items(input) -> list:
+        if isinstance(input, str):
+            return [{"role": "user", "content": input}]
+        return [i if isinstance(i, dict) else i.model_dump() for i in input]
+
+    def _tool_call(name: str, arguments: dict, n: int):
+        return ResponseFunctionToolCall(
+            id=f"fc_{name}_{n}", call_id=f"call_{name}_{n}", name=name,
+            arguments=json.dumps(arguments), type="function_call", status="completed",
+        )
+
+    def _turn(system_instructions, input) -> tuple:
+        """(output items, final answer text or None, input tokens) of the next scripted turn."""
+        items = _items(input)
+        query = next((str(i.get("content")) for i in items if i.get("role") == "user"), "")
+        names = {i["call_id"]: i["name"] for i in items if i.get("type") == "function_call"}
+        outputs = {names.get(i["call_id"]): str(i.get("output")) for i in items if i.get("type") == "function_call_output"}
+
+        text = None
+        if "mongo_tool" not in outputs:
+            output = [_tool_call("mongo_tool", {"query": query}, len(items))]
+        elif "summary_tool" not in outputs:
+            ids = re.findall(r"\d+", outputs["mongo_tool"])[:5]
+            output = [
+                _tool_call("summary_tool", {"article_ids": ids}, len(items)),
+                _tool_call("neo4j_tool", {"query": query, "article_ids": ids}, len(items)),
+            ]
+        else:
+            text = f"Answer to '{query}': " + outputs["summary_tool"][:300]
+            output = [ResponseOutputMessage(
+                id="msg_final", role="assistant", status="completed", type="message",
+                content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+            )]
+        input_tokens = (len(system_instructions or "") + len(json.dumps(items, default=str))) // 4
+        return output, text, input_tokens
+
+    class ScriptedAgentModel(Model):
+        async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                               handoffs, tracing, *args, **kwargs):
+            await _asleep_ms(latency_ms)
+            output, _, input_tokens = _turn(system_instructions, input)
+            usage = Usage(requests=1, input_tokens=input_tokens, output_tokens=50, total_tokens=input_tokens + 50)
+            return ModelResponse(output=output, usage=usage, response_id=None)
+
+        async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                                  handoffs, tracing, *args, **kwargs):
+            output, text, input_tokens = _turn(system_instructions, input)
+            sequence = 0
+            if text is None:
+                await _asleep_ms(latency_ms)
+            else:
+                step = max(len(text) // chunks, 1)
+                for start in range(0, len(text), step):
+                    await _asleep_ms(latency_ms / chunks)
+                    # model_construct: the required fields of these events vary across openai versions
+                    yield ResponseTextDeltaEvent.model_construct(
+                        type="response.output_text.delta", item_id="msg_final", output_index=0,
+                        content_index=0, delta=text[start:start + step], logprobs=[], sequence_number=sequence,
+                    )
+                    sequence += 1
+            usage = ResponseUsage.model_construct(
+                input_tokens=input_tokens, output_tokens=50, total_tokens=input_tokens + 50,
+                input_tokens_details=InputTokensDetails.model_construct(cached_tokens=0),
+                output_tokens_details=OutputTokensDetails.model_construct(reasoning_tokens=0),
+            )
+            response = Response.model_construct(
+                id=f"resp_{sequence}_{input_tokens}", object="response", created_at=time.time(), model="scripted",
+                output=output, tools=[], tool_choice="auto", parallel_tool_calls=True, usage=usage, status="completed",
+            )
+            yield ResponseCompletedEvent.model_construct(
+                type="response.completed", response=response, sequence_number=sequence,
+            )
+
+    return ScriptedAgentModel()
+
+
+class ChatMessage:
+    """`cl.Message`: records the streamed and sent content instead of rendering it."""
+
+    def __init__(self, content: str = "", **kwargs):
+        self.content = content
+
+    async def stream_token(self, token: str):
+        self.content += token
+
+    async def send(self):
+        UserSession.outbox().append(self)
+        return self
+
+    async def update(self):
+        return self
+
+    async def remove(self):
+        return None
+
+
+class ChatStep(ChatMessage):
+    """`cl.Step`."""
+
+    def __init__(self, name: str = "", type: str = "undefined", **kwargs):
+        super().__init__()
+        self.name = name
+
+    async def send(self):
+        return self
+
+
+class UserSession:
+    """`cl.user_session`, scoped to the asyncio task of one simulated session."""
+
+    _state = contextvars.ContextVar("chat_session")
+
+    def start(self, session_id: str):
+        self._state.set({"id": session_id, "_outbox": []})
+
+    @classmethod
+    def outbox(cls) -> list:
+        """Messages this session has sent, oldest first."""
+        return cls._state.get()["_outbox"]
+
+    def get(self, key: str, default=None):
+        return self._state.get().get(key, default)
+
+    def set(self, key: str, value):
+        self._state.get()[key] = value
+
+
+class FakeChainlit:
+    """Stands in for the `chainlit` module inside api.chain."""
+
+    Message = ChatMessage
+    Step = ChatStep
+    user_session = UserSession()
@@ -0,0 +1,195 @@
+"""
+Load generator for the Chainlit chat handler.
+
+Simulated chat sessions arrive at a Poisson rate and each one goes through
+`api.chain.start_chat` and `api.chain.handle_message` like a real user: a
+topic query (answered by the pipeline) or a structured author / category /
+link query (answered by the agent), then follow-ups, some of which ask for
+a summary, with think time in between. A turn counts as an error when the
+handler raises or replies with a "❌" message. Chainlit and every external
+service are replaced by the stand-ins in benchmarks.fakes, so what is
+measured is the handler's own concurrency.
+
+    python -m benchmarks.load [--rates 1 2 5 10] [--duration 20] [--follow-ups 2]
+                              [--structured-share 0.3] [--summary-share 0.3] [--think-ms 500]
+                              [--output load.json]
+
+For each arrival rate it reports message throughput, latency percentiles
+per message kind and the event-loop lag sampled while the sessions ran. Lag
+that grows with the rate points at synchronous work on the loop; latency
+that grows while lag stays flat points at a shared resource serializing
+sessions.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from benchmarks.fakes import AUTHORS, CATEGORIES, TOPICS, FakeChainlit, FakeMessage, UserSession
+from benchmarks.run import add_fake_arguments, install_fakes, percentile
+from services import answer_cache as answer_cache_module
+from services.answer_cache import answer_cache
+from services.tracing import configure_logging
+
+KINDS = ("topic", "structured", "follow_up", "summary")
+
+
+def structured_query(rng: random.Random) -> str:
+    author, category = rng.choice(AUTHORS), rng.choice(CATEGORIES)
+    return rng.choice([
+        f"articles written by {author}",
+        f"articles in the {category} category",
+        f"links to {category} articles written by {author}",
+    ])
+
+
+def session_script(rng: random.Random, follow_ups: int, summary_share: float, structured_share: float) -> list:
+    """(kind, text) turns of one session. Follow-ups stay close enough to the query to count as such."""
+    if rng.random() < structured_share:
+        query = structured_query(rng)
+        turns = [("structured", query)]
+    else:
+        query = f"latest {rng.choice(TOPICS)} news"
+        turns = [("topic", query)]
+    for n in range(follow_ups):
+        if rng.random() < summary_share:
+            turns.append(("summary", f"summary of the {query}"))
+        else:
+            turns.append(("follow_up", f"{query} and what comes next {n + 1}"))
+    return turns
+
+
+async def monitor_loop_lag(samples: list, stop: asyncio.Event, interval: float = 0.01):
+    """Record how late the loop wakes up a sleeper, in milliseconds."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max((time.perf_counter() - start - interval) * 1000, 0.0))
+
+
+async def run_session(chain, session_id: str, turns: list, think_seconds: float, results: dict):
+    FakeChainlit.user_session.start(session_id)
+    await chain.start_chat()
+    for i, (kind, text) in enumerate(turns):
+        if i:
+            await asyncio.sleep(think_seconds)
+        sent = len(UserSession.outbox())
+        start = time.perf_counter()
+        try:
+            await chain.handle_message(FakeMessage(text))
+        except Exception as e:
+            results["errors"].append(f"{kind}: {e!r}")
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+        # The handler reports its failures to the user instead of raising
+        failed = [m.content for m in UserSession.outbox()[sent:] if m.content.startswith("❌")]
+        if failed:
+            results["errors"].append(f"{kind}: {failed[0]}")
+            continue
+        results[kind].append(elapsed)
+
+
+async def run_rate(chain, rate: float, args) -> dict:
+    """Start sessions at `rate` per second for `args.duration` seconds and wait for all of them."""
+    rng = random.Random(args.seed)
+    results = {kind: [] for kind in KINDS}
+    results["errors"] = []
+    lag, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(lag, stop))
+
+    sessions, start, n = [], time.perf_counter(), 0
+    while time.perf_counter() - start < args.duration:
+        turns = session_script(rng, args.follow_ups, args.summary_share, args.structured_share)
+        sessions.append(asyncio.create_task(
+            run_session(chain, f"load-{rate}-{n}", turns, args.think_ms / 1000, results)
+        ))
+        n += 1
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*sessions)
+    wall = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    messages = sum(len(results[kind]) for kind in KINDS)
+    return {
+        "rate": rate,
+        "sessions": n,
+        "messages": messages,
+        "errors": len(results["errors"]),
+        "error_samples": results["errors"][:5],
+        "throughput_mps": round(messages / wall, 2),
+        "latency": {
+            kind: {
+                "count": len(results[kind]),
+                "p50_ms": percentile(results[kind], 50),
+                "p95_ms": percentile(results[kind], 95),
+                "p99_ms": percentile(results[kind], 99),
+            }
+            for kind in KINDS
+        },
+        "loop_lag": {
+            "p50_ms": percentile(lag, 50),
+            "p95_ms": percentile(lag, 95),
+            "max_ms": round(max(lag), 3) if lag else 0.0,
+        },
+    }
+
+
+def print_report(reports: list):
+    header = f"{'sessions/s':>10}{'msgs/s':>9}{'errors':>8}"
+    header += "".join(f"{kind + ' p50/p95 ms':>26}" for kind in KINDS)
+    header += f"{'loop lag p95/max ms':>22}"
+    print(header)
+    for r in reports:
+        line = f"{r['rate']:>10}{r['throughput_mps']:>9}{r['errors']:>8}"
+        for kind in KINDS:
+            stats = r["latency"][kind]
+            line += f"{stats['p50_ms']:>13}/{stats['p95_ms']:<12}"
+        line += f"{r['loop_lag']['p95_ms']:>11}/{r['loop_lag']['max_ms']}"
+        print(line)
+        for sample in r["error_samples"]:
+            print(f"  ❌ {sample}")
+
+
+async def run(args) -> list:
+    install_fakes(args)
+    # Imported once the stand-ins are in place: the module warms resources up on import
+    import api.chain as chain
+    chain.cl = FakeChainlit
+    if args.no_answer_cache:
+        answer_cache_module.ANSWER_CACHE_MAX_ENTRIES = 0
+
+    reports = []
+    for rate in args.rates:
+        answer_cache.clear()
+        reports.append(await run_rate(chain, rate, args))
+    return reports
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent chat sessions through the Chainlit handler, offline.")
+    add_fake_arguments(parser)
+    parser.add_argument("--rates", type=float, nargs="+", default=[1.0, 2.0, 5.0, 10.0],
+                        help="Session arrival rates (sessions per second) to run one after another")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds during which sessions arrive, per rate")
+    parser.add_argument("--follow-ups", type=int, default=2, help="Messages after the first query, per session")
+    parser.add_argument("--structured-share", type=float, default=0.3,
+                        help="Share of sessions opening with an author/category/link query")
+    parser.add_argument("--summary-share", type=float, default=0.3, help="Share of follow-ups asking for a summary")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Pause between a session's messages")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Answer every new query from scratch")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    reports = asyncio.run(run(args))
+    print_report(reports)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=4)
+    return 1 if any(r["errors"] for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Offline benchmarks of the retrieval tools and the full agent run.
+
+Every external service is replaced by the deterministic stand-ins in
+benchmarks.fakes: scripted LLMs with fixed latency, an in-memory
+`summaries` collection and graph, and a synthetic FAISS corpus. Results
+are therefore stable enough to gate CI.
+
+    python -m benchmarks.run [--corpus-size 2000] [--iterations 30] [--concurrency 4]
+                             [--output report.json] [--write-thresholds]
+
+Reports p50/p95 end-to-end latency, throughput and per-stage latency (from
+the request spans) for mongo_tool, summary_tool, neo4j_tool and the
+query_agent run, and exits with status 1 when any benchmark is slower than
+benchmarks/thresholds.json allows.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Settings read at import time by the modules under test
+_WORKDIR = tempfile.mkdtemp(prefix="nka-bench-")
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("CYPHER_CACHE_PATH", os.path.join(_WORKDIR, "cypher_cache.json"))
+os.environ.setdefault("TRACE_FLUSH_SECONDS", "0")
+os.environ.setdefault("TRACE_EXPORT_PATH", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Hashed bag-of-words vectors have no calibrated similarity; let topic queries reach the pipeline
+os.environ.setdefault("PIPELINE_MIN_SIMILARITY", "0")
+
+import numpy as np
+from agents import Runner, set_tracing_disabled
+from benchmarks.fakes import (
+    FakeChatModel, FakeCypherChain, FakeSummaries, HashEmbeddings, InMemoryGraph, SyntheticCorpus,
+    make_agent_model, TOPICS,
+)
+from constants.connection.mongodb_connection import get_mongo_client, mongo_connection
+from constants.connection.neo4j_connection import get_neo4j_driver, get_neo4j_graph
+from constants.llms import models
+from llmAgents.query_agent import query_agent
+from services import mongo_tool, neo4j_tool
+from services.article_metadata import ArticleMetadataIndex
+from services.embedding_service import get_embedding_model
+from services.llm_limits import LimitedModel
+from services.cypher_cache import cypher_cache
+from services.request_context import request_scope
+from services.summary_cache import summary_cache
+from services.tracing import TracingRunHooks, configure_logging
+from services.vector_index import build_index
+
+THRESHOLDS_FILE = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+
+def install_fakes(args) -> SyntheticCorpus:
+    """Point the tools at the local stand-ins and a synthetic index of `args.corpus_size` articles."""
+    corpus = SyntheticCorpus.generate(args.corpus_size, seed=args.seed)
+    index_path = os.path.join(_WORKDIR, "faiss_index")
+    hash_embeddings = HashEmbeddings()
+    build_index(index_path, corpus.documents(), hash_embeddings, kind=args.index_kind)
+    ArticleMetadataIndex(corpus.metadata()).save(index_path)
+
+    get_embedding_model.set(hash_embeddings)
+    mongo_tool.FAISS_PATH = index_path
+    mongo_tool.get_vector_store.reset()
+    mongo_tool.get_article_metadata.reset()
+    mongo_tool.get_lexical_index.reset()
+
+    summaries = FakeSummaries(corpus, latency_ms=args.mongo_latency_ms)
+    mongo_connection.summaries = classmethod(lambda cls: summaries)
+    neo4j_tool.connection = InMemoryGraph(corpus, latency_ms=args.neo4j_latency_ms)
+    models.get_chain.set(FakeCypherChain(latency_ms=args.cypher_latency_ms))
+    # Never connect to the real services, not even from a warm-up
+    for resource in (get_mongo_client, get_neo4j_driver, get_neo4j_graph):
+        resource.set(None)
+
+    models.gemini_llm = FakeChatModel(latency_ms=args.llm_latency_ms)
+    models.groq_llm = FakeChatModel(latency_ms=args.llm_latency_ms)
+    query_agent.model = LimitedModel(make_agent_model(latency_ms=args.llm_latency_ms), provider="gemini")
+    set_tracing_disabled(True)
+    return corpus
+
+
+def _tool_context(tool, arguments: str):
+    """A ToolContext for a direct tool call, across Agents SDK versions."""
+    from agents import RunContextWrapper
+    try:
+        from agents.tool_context import ToolContext
+    except ImportError:
+        return RunContextWrapper(context=None)
+    for extra in ({"tool_arguments": arguments}, {}):
+        try:
+            return ToolContext(context=None, tool_name=tool.name, tool_call_id="benchmark", **extra)
+        except TypeError:
+            continue
+    return RunContextWrapper(context=None)
+
+
+async def invoke_tool(tool, **kwargs):
+    arguments = json.dumps(kwargs)
+    result = await tool.on_invoke_tool(_tool_context(tool, arguments), arguments)
+    # Function tools report failures to the model as text instead of raising
+    if isinstance(result, str) and result.startswith("An error occurred"):
+        raise RuntimeError(f"{tool.name} failed: {result}")
+    return result
+
+
+def percentile(values: list, q: float) -> float:
+    return round(float(np.percentile(values, q)), 3) if values else 0.0
+
+
+async def measure(name: str, call, iterations: int, concurrency: int, warmup: int = 2) -> dict:
+    """Run `call(i)` `iterations` times, `concurrency` at a time, each in its own request scope."""
+    latencies, stages = [], {}
+
+    async def one(i: int, record: bool):
+        with request_scope(f"{name} {i}", budget_seconds=0) as ctx:
+            start = time.perf_counter()
+            await call(i)
+            elapsed = (time.perf_counter() - start) * 1000
+        if record:
+            latencies.append(elapsed)
+            for span in ctx.spans:
+                stages.setdefault(span.name, []).append(span.seconds * 1000)
+
+    for i in range(warmup):
+        await one(-1 - i, record=False)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(i: int):
+        async with semaphore:
+            await one(i, record=True)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(guarded(i) for i in range(iterations)))
+    wall = time.perf_counter() - start
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "throughput_rps": round(iterations / wall, 2),
+        "stages": {
+            stage: {"count": len(values), "p50_ms": percentile(values, 50), "p95_ms": percentile(values, 95)}
+            for stage, values in stages.items()
+        },
+    }
+
+
+def benchmarks(corpus: SyntheticCorpus) -> dict:
+    """name → async callable(i) for each benchmarked entry point."""
+    ids = [a["article_id"] for a in corpus.articles]
+
+    def query(i: int) -> str:
+        return f"latest {TOPICS[i % len(TOPICS)]} news"
+
+    def sample_ids(i: int) -> list:
+        return [ids[(i * 7 + j * 13) % len(ids)] for j in range(5)]
+
+    async def summary(i: int):
+        # Cold summary cache, so every call reaches the collection
+        summary_cache.invalidate(sample_ids(i))
+        await invoke_tool(mongo_tool.summary_tool, article_ids=sample_ids(i))
+
+    async def neo4j_generated(i: int):
+        cypher_cache.clear()
+        await invoke_tool(neo4j_tool.neo4j_tool, query=f"which articles were published most recently {i}")
+
+    async def agent(i: int):
+        await Runner.run(query_agent, query(i), hooks=TracingRunHooks())
+
+    async def agent_streamed(i: int):
+        # The path Chainlit and Streamlit serve agent answers through
+        result = Runner.run_streamed(query_agent, query(i), hooks=TracingRunHooks())
+        async for _ in result.stream_events():
+            pass
+
+    return {
+        "mongo_tool": lambda i: invoke_tool(mongo_tool.mongo_tool, query=query(i)),
+        "summary_tool": summary,
+        "neo4j_tool_template": lambda i: invoke_tool(neo4j_tool.neo4j_tool, query=query(i), article_ids=sample_ids(i)),
+        "neo4j_tool_generated": neo4j_generated,
+        "query_agent": agent,
+        "query_agent_streamed": agent_streamed,
+    }
+
+
+def check_thresholds(results: dict, thresholds: dict) -> list:
+    """Messages for every benchmark whose p95 latency or throughput is past its threshold."""
+    failures = []
+    for name, limits in thresholds.items():
+        result = results.get(name)
+        if result is None:
+            continue
+        if "p95_ms" in limits and result["p95_ms"] > limits["p95_ms"]:
+            failures.append(f"{name}: p95 {result['p95_ms']}ms > {limits['p95_ms']}ms")
+        if "min_throughput_rps" in limits and result["throughput_rps"] < limits["min_throughput_rps"]:
+            failures.append(f"{name}: {result['throughput_rps']} req/s < {limits['min_throughput_rps']} req/s")
+    return failures
+
+
+def print_report(results: dict):
+    print(f"{'benchmark':<24}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>10}")
+    for name, result in results.items():
+        print(f"{name:<24}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['throughput_rps']:>10}")
+        for stage, stats in result["stages"].items():
+            print(f"  {stage:<22}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{'x' + str(stats['count']):>10}")
+
+
+async def run(args) -> dict:
+    corpus = install_fakes(args)
+    selected = benchmarks(corpus)
+    names = args.only or list(selected)
+    results = {}
+    for name in names:
+        results[name] = await measure(name, selected[name], args.iterations, args.concurrency)
+    return results
+
+
+def add_fake_arguments(parser: argparse.ArgumentParser):
+    """Corpus and stand-in latency options shared by the benchmark entry points."""
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    parser.add_argument("--index-kind", default="flat")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--cypher-latency-ms", type=float, default=30.0)
+    parser.add_argument("--mongo-latency-ms", type=float, default=5.0)
+    parser.add_argument("--neo4j-latency-ms", type=float, default=5.0)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks with local stand-ins for LLMs, Mongo and Neo4j.")
+    add_fake_arguments(parser)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--only", nargs="*", help="Benchmarks to run (default: all)")
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    parser.add_argument("--write-thresholds", action="store_true",
+                        help="Record 2x the measured p95 and half the throughput as the new thresholds")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.write_thresholds:
+        thresholds = {
+            name: {"p95_ms": round(r["p95_ms"] * 2, 1), "min_throughput_rps": round(r["throughput_rps"] / 2, 2)}
+            for name, r in results.items()
+        }
+        with open(args.thresholds, "w") as f:
+            json.dump(thresholds, f, indent=4)
+        print(f"✅ Thresholds written to {args.thresholds}")
+        return 0
+
+    with open(args.thresholds) as f:
+        failures = check_thresholds(results, json.load(f))
+    for failure in failures:
+        print(f"❌ Regression: {failure}")
+    if not failures:
+        print("✅ All benchmarks within thresholds")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
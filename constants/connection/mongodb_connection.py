@@ -1,9 +1,38 @@
 from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
+from constants.resources import lazy_resource
 load_dotenv()
 
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+
+
+@lazy_resource("mongo_client")
+def get_mongo_client():
+    return MongoClient(
+        os.getenv("MONGODB_URL"),
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+    )
+
+
 class mongo_connection:
-    mongo_client = MongoClient(os.getenv("MONGODB_URL"))
-    db = mongo_client["news_db"]
-    collection = db["aspects"]
\ No newline at end of file
+    mongo_client = get_mongo_client
+
+    @classmethod
+    def db(cls):
+        return cls.mongo_client()["news_db"]
+
+    @classmethod
+    def collection(cls):
+        return cls.db()["aspects"]
+
+    @classmethod
+    def summaries(cls):
+        return cls.db()["summaries"]
+
+    @classmethod
+    def close(cls):
+        if cls.mongo_client.loaded:
+            cls.mongo_client().close()
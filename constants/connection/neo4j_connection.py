@@ -1,10 +1,152 @@
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, AsyncGraphDatabase, READ_ACCESS, WRITE_ACCESS, unit_of_work
+from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
+import asyncio
 import os
+import time
+import weakref
 from dotenv import load_dotenv
 from langchain_neo4j import Neo4jGraph
+from constants.resources import lazy_resource
 load_dotenv()
+
+NEO4J_URL = os.getenv("NEO4J_URL")
+NEO4J_AUTH = (os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "30"))
+NEO4J_MAX_RETRIES = int(os.getenv("NEO4J_MAX_RETRIES", "3"))
+NEO4J_RETRY_BACKOFF = float(os.getenv("NEO4J_RETRY_BACKOFF", "0.2"))
+
+# Errors after which the same read can safely be attempted again on a fresh
+# connection from the pool.
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+DRIVER_CONFIG = {
+    "auth": NEO4J_AUTH,
+    "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+    "connection_acquisition_timeout": NEO4J_ACQUISITION_TIMEOUT,
+    # Retries are ours, bounded by NEO4J_MAX_RETRIES and the caller's timeout;
+    # the driver's own ~30 s retry inside execute_read/execute_write would
+    # multiply them.
+    "max_transaction_retry_time": 0,
+}
+
+
+def _read_records(tx, cypher, params):
+    return [record.data() for record in tx.run(cypher, params)]
+
+
+async def _read_records_async(tx, cypher, params):
+    result = await tx.run(cypher, params)
+    return [record.data() async for record in result]
+
+
+def _with_timeout(work, timeout: float = None):
+    """Bound a transaction function by a server-side timeout in seconds."""
+    return unit_of_work(timeout=timeout)(work) if timeout else work
+
+
+def _retry_allowed(attempt: int, started: float, timeout: float = None) -> bool:
+    if attempt == NEO4J_MAX_RETRIES:
+        return False
+    return timeout is None or time.monotonic() - started + NEO4J_RETRY_BACKOFF * 2 ** attempt < timeout
+
+
+@lazy_resource("neo4j_driver")
+def get_neo4j_driver():
+    return GraphDatabase.driver(NEO4J_URL, **DRIVER_CONFIG)
+
+
+@lazy_resource("neo4j_graph")
+def get_neo4j_graph():
+    # Neo4jGraph introspects the schema on construction.
+    return Neo4jGraph(url=NEO4J_URL, username=NEO4J_AUTH[0], password=NEO4J_AUTH[1])
+
+
 class connection:
-    neo4j_driver = GraphDatabase.driver(os.getenv("NEO4J_URL"), auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")))
-    graph = Neo4jGraph(url=os.getenv("NEO4J_URL"), username=os.getenv("NEO4J_USER"), password=os.getenv("NEO4J_PASSWORD"))
-    session = neo4j_driver.session()
-    
\ No newline at end of file
+    """
+    Pooled Neo4j access. Every read runs in its own session and read
+    transaction borrowed from the driver's connection pool, so concurrent
+    requests never share a session.
+    """
+    neo4j_driver = get_neo4j_driver
+    graph = get_neo4j_graph
+    # Async drivers are bound to the event loop that created them, and
+    # Streamlit starts a new loop per request, so keep one per loop.
+    _async_drivers = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def async_driver(cls):
+        loop = asyncio.get_running_loop()
+        driver = cls._async_drivers.get(loop)
+        if driver is None:
+            driver = AsyncGraphDatabase.driver(NEO4J_URL, **DRIVER_CONFIG)
+            cls._async_drivers[loop] = driver
+        return driver
+
+    @classmethod
+    async def close_async_driver(cls):
+        """Close the current event loop's async driver, if it opened one."""
+        driver = cls._async_drivers.pop(asyncio.get_running_loop(), None)
+        if driver is not None:
+            await driver.close()
+
+    @classmethod
+    def run(cls, coro):
+        """
+        `asyncio.run(coro)` that closes the async driver the new loop opened
+        before the loop goes away. Use it wherever a request runs on a loop of
+        its own, as Streamlit does.
+        """
+        async def main():
+            try:
+                return await coro
+            finally:
+                await cls.close_async_driver()
+        return asyncio.run(main())
+
+    @classmethod
+    def read(cls, cypher: str, params: dict = None, timeout: float = None) -> list:
+        """
+        Run a read query in a per-call read transaction, retrying transient
+        failures while `timeout` seconds allow.
+        """
+        started = time.monotonic()
+        for attempt in range(NEO4J_MAX_RETRIES + 1):
+            try:
+                with cls.neo4j_driver().session(default_access_mode=READ_ACCESS) as session:
+                    return session.execute_read(_with_timeout(_read_records, timeout), cypher, params or {})
+            except RETRYABLE_ERRORS:
+                if not _retry_allowed(attempt, started, timeout):
+                    raise
+                time.sleep(NEO4J_RETRY_BACKOFF * 2 ** attempt)
+
+    @classmethod
+    def write(cls, cypher: str, params: dict = None, timeout: float = None) -> list:
+        """Run a write query in a per-call write transaction, retrying transient failures."""
+        started = time.monotonic()
+        for attempt in range(NEO4J_MAX_RETRIES + 1):
+            try:
+                with cls.neo4j_driver().session(default_access_mode=WRITE_ACCESS) as session:
+                    return session.execute_write(_with_timeout(_read_records, timeout), cypher, params or {})
+            except RETRYABLE_ERRORS:
+                if not _retry_allowed(attempt, started, timeout):
+                    raise
+                time.sleep(NEO4J_RETRY_BACKOFF * 2 ** attempt)
+
+    @classmethod
+    async def read_async(cls, cypher: str, params: dict = None, timeout: float = None) -> list:
+        """Async counterpart of `read` on the current event loop's driver."""
+        started = time.monotonic()
+        for attempt in range(NEO4J_MAX_RETRIES + 1):
+            try:
+                async with cls.async_driver().session(default_access_mode=READ_ACCESS) as session:
+                    return await session.execute_read(_with_timeout(_read_records_async, timeout), cypher, params or {})
+            except RETRYABLE_ERRORS:
+                if not _retry_allowed(attempt, started, timeout):
+                    raise
+                await asyncio.sleep(NEO4J_RETRY_BACKOFF * 2 ** attempt)
+
+    @classmethod
+    def close(cls):
+        if cls.neo4j_driver.loaded:
+            cls.neo4j_driver().close()
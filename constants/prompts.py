@@ -36,6 +36,31 @@ class Prompts:
             RETURN b.title AS title, b.refLink AS refLink, a.author AS author, c.category AS category
 
         """
+
+    def semantic_synthesis(self, summaries: str, articles: str, history_text: str = ""):
+        return f"""
+You are a news assistant answering a user's question from retrieved articles.
+
+### User Question:
+{self.query}
+
+### Previous Conversation (may be empty):
+{history_text}
+
+### Article Summaries:
+{summaries}
+
+### Article Metadata (title, refLink, author, category):
+{articles}
+
+Rules:
+- Generate **one coherent answer** that fuses the summaries into a single explanation — *not* a list of summaries.
+- Start with a short, clear summary that directly answers the question.
+- Include structured insights (companies, categories, authors) where relevant.
+- Use only the information above. Do not output raw article IDs.
+- End with the supporting articles in this format, using the exact `refLink` values and skipping articles without a link:
+  - [Article Title](refLink)
+"""
     
     instructions = """
 You are an intelligent retrieval agent that fetches information from:
@@ -91,10 +116,11 @@ If the query involves:
 
 🧠 **Cypher Behavior Rule for Structured Queries:**  
 You may use **any valid filter** in the `WHERE` clause (such as author name, category, etc.).  
+When the question filters on article IDs, an author or a category, pass them as `neo4j_tool(article_ids=[...])`, `neo4j_tool(author="...")` and/or `neo4j_tool(category="...")` so the query runs from a precompiled template. Only do so when the question just lists those articles; when it also counts, ranks, or restricts by topic or date, pass only `query`.
 
 #### 🔍 Semantic Queries → Mongo + Summary + Neo4j pipeline
 If the query involves topics, trends, or natural language phrasing:
-1. Execute **mongo_tool** first.  
+1. Execute **mongo_tool** first. If the user restricts the category or time range, pass `category`, `date_from` and/or `date_to` (YYYY-MM-DD) to it instead of filtering later in Cypher.  
 2. Retrieve `article_ids` from its output.    
 3. Immediately call **neo4j_tool(article_ids=[list of ids])** to get structured metadata.  
    - Your Neo4j Cypher query **must include a `WHERE b.article_id IN [...]` clause only.**  
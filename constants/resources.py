@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Resource:
+    """
+    A heavy, process-wide object (model, index, client, chain) created on
+    first use instead of at import time. Calling the resource returns the
+    instance; creation is thread-safe and timed for the startup report.
+    """
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self.seconds = None
+        self.error = None
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __call__(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.error = repr(e)
+                    raise
+                finally:
+                    self.seconds = time.perf_counter() - start
+                self.error = None
+                self._loaded = True
+                logger.info("Loaded %s in %.2fs", self.name, self.seconds)
+        return self._value
+
+    def set(self, value):
+        """Replace the instance, e.g. to swap in a rebuilt index or a local stand-in."""
+        with self._lock:
+            self._value = value
+            self._loaded = True
+
+    def reset(self):
+        """Drop the instance so the next call recreates it."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+
+
+def lazy_resource(name: str):
+    """Register the decorated factory as a lazily created resource."""
+    def decorator(factory):
+        resource = Resource(name, factory)
+        _registry[name] = resource
+        return resource
+    return decorator
+
+
+def startup_report() -> dict:
+    """Creation time, state and last error of every registered resource."""
+    return {
+        name: {"loaded": r.loaded, "seconds": r.seconds, "error": r.error}
+        for name, r in _registry.items()
+    }
+
+
+def format_startup_report() -> str:
+    lines = []
+    for name, info in startup_report().items():
+        if info["error"]:
+            lines.append(f"  ❌ {name}: {info['error']}")
+        elif info["loaded"] and info["seconds"] is not None:
+            lines.append(f"  ✅ {name}: {info['seconds']:.2f}s")
+        else:
+            lines.append(f"  ⏸️ {name}: not loaded")
+    return "Startup report:\n" + "\n".join(lines)
+
+
+_warm_up_lock = threading.Lock()
+_warm_up_thread = None
+
+
+def warm_up(names: list = None, background: bool = True):
+    """
+    Create the named resources (all registered ones by default) in parallel.
+    With background=True this returns immediately and is a no-op while a
+    previous background warm-up is still running. Failures are logged, not
+    raised: the resource is retried on first use.
+    """
+    global _warm_up_thread
+
+    def run():
+        resources = [_registry[n] for n in (names or list(_registry))]
+        with ThreadPoolExecutor(max_workers=max(len(resources), 1), thread_name_prefix="warm-up") as pool:
+            for resource, future in [(r, pool.submit(r)) for r in resources]:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning("Warm-up of %s failed: %s", resource.name, e)
+        logger.info(format_startup_report())
+
+    if not background:
+        run()
+        return None
+    with _warm_up_lock:
+        if all(_registry[n].loaded for n in (names or list(_registry))):
+            return None
+        if _warm_up_thread is None or not _warm_up_thread.is_alive():
+            _warm_up_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import re
+from agents import Runner
+from constants.llms import models
+from constants.prompts import Prompts
+from llmAgents.query_agent import query_agent
+from services.mongo_tool import search_article_ids, fetch_summaries
+from services.neo4j_tool import fetch_articles_by_ids
+from services.llm_limits import llm_slot
+from services.request_context import current_request_context
+from services.answer_cache import cache_answer, cached_answer
+from services.token_budget import account, count_tokens, fit_tool_output, record_usage
+from services.tracing import TracingRunHooks
+from services.deadline import (
+    SYNTHESIS_MIN_SECONDS, DeadlineExceeded, degraded_answer, has_time_for, with_deadline,
+)
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "auto" routes topic queries through the fixed pipeline and everything else
+# through the agent; "pipeline" and "agent" force one path.
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "auto").lower()
+
+# Words that mark a query as structured (Neo4j only) in the agent instructions.
+STRUCTURED_PATTERN = re.compile(
+    r"\b(author|authors|wrote|written|writer|category|categories|link|links|reflink|published by)\b",
+    re.IGNORECASE,
+)
+
+# Cosine similarity the best article must reach for the pipeline to answer;
+# below it (greetings, small talk, off-topic questions) the agent answers.
+PIPELINE_MIN_SIMILARITY = float(os.getenv("PIPELINE_MIN_SIMILARITY", "0.3"))
+
+
+def use_pipeline(query: str) -> bool:
+    """Decide whether a query can skip agent tool planning."""
+    if PIPELINE_MODE == "agent":
+        return False
+    if PIPELINE_MODE == "pipeline":
+        return True
+    return not STRUCTURED_PATTERN.search(query)
+
+
+async def build_synthesis_prompt(query: str, history_text: str = "") -> str | None:
+    """
+    Run the FAISS search once and fetch summaries and article metadata
+    concurrently.
+
+    Returns:
+        The synthesis prompt, or None when no relevant articles or summaries
+        were found so the caller can fall back to the agent.
+    """
+    article_ids = await asyncio.to_thread(search_article_ids, query, 5, min_similarity=PIPELINE_MIN_SIMILARITY)
+    if not article_ids:
+        return None
+
+    summaries, articles = await asyncio.gather(
+        fetch_summaries(article_ids),
+        fetch_articles_by_ids(article_ids),
+    )
+    if not summaries:
+        return None
+
+    articles_text = "\n".join(
+        f"- {a.get('title')} | {a.get('refLink')} | {a.get('author')} | {a.get('category')}"
+        for a in articles
+    )
+    summaries_text = "\n\n".join(fit_tool_output(summaries, query))
+    prompt = Prompts(query).semantic_synthesis(summaries_text, articles_text, history_text)
+    account("tool_outputs", articles_text)
+    current_request_context().add_tokens(
+        "instructions",
+        count_tokens(prompt) - count_tokens(summaries_text) - count_tokens(articles_text) - count_tokens(history_text),
+    )
+    return prompt
+
+
+async def run_semantic_pipeline(query: str, history_text: str = "") -> str | None:
+    """
+    Mongo → Summary + Neo4j pipeline without the agent loop, answered with a
+    single synthesis LLM call.
+
+    Returns:
+        The answer text, or None when nothing was found. When the deadline
+        leaves no time for synthesis, the summaries are returned as-is.
+    """
+    prompt = await build_synthesis_prompt(query, history_text)
+    if prompt is None:
+        return None
+    if not has_time_for(SYNTHESIS_MIN_SECONDS):
+        return degraded_answer()
+    try:
+        async with llm_slot("gemini"):
+            with current_request_context().timed("synthesis", prompt_tokens=count_tokens(prompt)):
+                response = await with_deadline(models.gemini_llm.ainvoke(prompt), "synthesis")
+    except DeadlineExceeded:
+        return degraded_answer()
+    return getattr(response, "content", str(response)).strip() or None
+
+
+async def complete_prompt(prompt: str, stage: str) -> str:
+    """
+    One Gemini call for a follow-up or summary prompt, within the provider
+    limit and the request's deadline.
+
+    Returns:
+        The reply text, or the degraded answer when the deadline passes.
+    """
+    try:
+        async with llm_slot("gemini"):
+            with current_request_context().timed(stage, prompt_tokens=count_tokens(prompt)):
+                response = await with_deadline(models.gemini_llm.ainvoke(prompt), stage)
+    except DeadlineExceeded:
+        return degraded_answer()
+    return getattr(response, "content", str(response)).strip()
+
+
+async def answer_query(query: str, agent_input, history_text: str = ""):
+    """
+    Answer a main query from the answer cache, through the pipeline when
+    possible, otherwise through `query_agent`.
+
+    Returns:
+        tuple: (answer_text, agent_response). agent_response is None when the
+        cache or the pipeline answered, or the deadline forced a degraded
+        answer.
+    """
+    answer_text = await asyncio.to_thread(cached_answer, query, history_text)
+    if answer_text is not None:
+        return answer_text, None
+
+    account("history", history_text)
+    answer_text, response = await _answer_uncached(query, agent_input, history_text)
+    record_usage(response)
+    account("answer", answer_text)
+    await asyncio.to_thread(cache_answer, query, answer_text, history_text)
+    return answer_text, response
+
+
+async def _answer_uncached(query: str, agent_input, history_text: str = ""):
+    if use_pipeline(query):
+        try:
+            answer_text = await run_semantic_pipeline(query, history_text)
+            if answer_text:
+                return answer_text, None
+        except DeadlineExceeded:
+            return degraded_answer(), None
+        except Exception as e:
+            logger.warning("⚠️ Semantic pipeline failed, falling back to agent: %s", e)
+
+    try:
+        response = await with_deadline(Runner.run(query_agent, agent_input, hooks=TracingRunHooks()), "agent")
+    except DeadlineExceeded:
+        return degraded_answer(), None
+    return str(response.final_output), response
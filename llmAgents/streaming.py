@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from agents import Runner
+from openai.types.responses import ResponseTextDeltaEvent
+from constants.llms import models
+from llmAgents.query_agent import query_agent
+from llmAgents.semantic_pipeline import build_synthesis_prompt, use_pipeline
+from services.llm_limits import llm_slot
+from services.request_context import current_request_context
+from services.answer_cache import cache_answer, cached_answer
+from services.token_budget import account, count_tokens, record_usage
+from services.tracing import TracingRunHooks
+from services.deadline import (
+    SYNTHESIS_MIN_SECONDS, DeadlineExceeded, degraded_answer, has_time_for, iterate_with_deadline,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamEvent:
+    """
+    One update while a main query is answered.
+
+    kind is "progress" (a tool or pipeline step, text is a short status line),
+    "token" (text is the next piece of the answer) or "done" (text is the
+    full answer and response the agent's RunResultStreaming, None when the
+    pipeline answered).
+    """
+    kind: str
+    text: str = ""
+    response: object = None
+
+
+def _tool_name(item) -> str:
+    raw = getattr(item, "raw_item", None)
+    return getattr(raw, "name", None) or (raw.get("name") if isinstance(raw, dict) else None) or "tool"
+
+
+async def _stream_pipeline(query: str, history_text: str):
+    ctx = current_request_context()
+    yield StreamEvent("progress", "🔎 Searching articles...")
+    prompt = await build_synthesis_prompt(query, history_text)
+    if prompt is None:
+        return
+    if not has_time_for(SYNTHESIS_MIN_SECONDS):
+        yield StreamEvent("token", degraded_answer())
+        return
+    yield StreamEvent("progress", "✍️ Writing the answer...")
+    async with llm_slot("gemini"):
+        with ctx.timed("synthesis", prompt_tokens=count_tokens(prompt)):
+            async for chunk in iterate_with_deadline(models.gemini_llm.astream(prompt), "synthesis"):
+                token = getattr(chunk, "content", "") or ""
+                if token:
+                    ctx.mark("first_token")
+                    yield StreamEvent("token", token)
+
+
+async def _stream_agent(agent_input):
+    result = Runner.run_streamed(query_agent, agent_input, hooks=TracingRunHooks())
+    try:
+        async for event in _agent_events(result):
+            yield event
+    except DeadlineExceeded:
+        result.cancel()
+        answer_text = degraded_answer()
+        yield StreamEvent("token", answer_text)
+        yield StreamEvent("done", answer_text)
+        return
+    yield StreamEvent("done", str(result.final_output), result)
+
+
+async def _agent_events(result):
+    ctx = current_request_context()
+    async for event in iterate_with_deadline(result.stream_events(), "agent"):
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            if event.data.delta:
+                ctx.mark("first_token")
+                yield StreamEvent("token", event.data.delta)
+        elif event.type == "run_item_stream_event":
+            if event.item.type == "tool_call_item":
+                yield StreamEvent("progress", f"🛠️ Calling {_tool_name(event.item)}...")
+            elif event.item.type == "tool_call_output_item":
+                yield StreamEvent("progress", "✅ Tool finished")
+
+
+async def stream_answer(query: str, agent_input, history_text: str = "", cache: bool = True):
+    """
+    Streaming counterpart of `answer_query`: yields progress and token
+    events as they happen and a final "done" event with the full answer.
+
+    A cached answer for a similar query is returned as one token. The
+    pipeline is tried next when the query allows it; if it finds nothing or
+    fails before the first token, the agent answers instead. When the
+    request's deadline passes, the answer degrades to the retrieved
+    summaries or Neo4j rows (see services.deadline).
+
+    Args:
+        cache: Store the answer in the answer cache. Callers that post-process
+            the answer (e.g. refine it) pass False and cache the final text
+            themselves.
+    """
+    answer_text = await asyncio.to_thread(cached_answer, query, history_text)
+    if answer_text is not None:
+        yield StreamEvent("token", answer_text)
+        yield StreamEvent("done", answer_text)
+        return
+
+    account("history", history_text)
+    async for event in _stream_uncached(query, agent_input, history_text):
+        if event.kind == "done":
+            record_usage(event.response)
+            account("answer", event.text)
+            if cache:
+                await asyncio.to_thread(cache_answer, query, event.text, history_text)
+        yield event
+
+
+async def _stream_uncached(query: str, agent_input, history_text: str = ""):
+    if use_pipeline(query):
+        parts = []
+        try:
+            async for event in _stream_pipeline(query, history_text):
+                if event.kind == "token":
+                    parts.append(event.text)
+                yield event
+        except DeadlineExceeded:
+            # Past the deadline: keep the partial answer, or fall back to what was retrieved
+            if parts:
+                current_request_context().degrade("synthesis_cut")
+            else:
+                parts.append(degraded_answer())
+                yield StreamEvent("token", parts[-1])
+        except Exception as e:
+            if parts:
+                raise
+            logger.warning("⚠️ Semantic pipeline failed, falling back to agent: %s", e)
+        answer_text = "".join(parts).strip()
+        if answer_text:
+            yield StreamEvent("done", answer_text)
+            return
+
+    async for event in _stream_agent(agent_input):
+        yield event
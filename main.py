@@ -1,21 +1,20 @@
-from agents import Agent, Runner
-from services import mongo_tool, neo4j_tool
-from services.mongo_tool import vector_store
-from langchain.memory import VectorStoreRetrieverMemory
-import asyncio
-from constants.llms import models
-from constants.prompts import Prompts
-from llmAgents.query_agent import query_agent
+from services.conversation_memory import conversation_store
+from constants.resources import warm_up, format_startup_report
+from llmAgents.semantic_pipeline import answer_query, complete_prompt
+from services.request_context import request_scope
+from services.token_budget import token_metrics
 from constants.connection.neo4j_connection import connection
 from constants.connection.mongodb_connection import mongo_connection
+from services.tracing import collector, configure_logging
+from services.cypher_cache import cypher_cache
 import logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-memory = VectorStoreRetrieverMemory(retriever=retriever, memory_key="chat_history")
-
 async def main():
+    # Resources load in the background while the user types the first query
+    warm_up()
+    memory = conversation_store.get("cli")
     while True:
         query = input("Enter your query (or type 'exit' to quit): ")
         system_message = [{
@@ -31,13 +30,14 @@ async def main():
         if query.strip().lower() == "exit":
             print("Bot: Goodbye! 👋")
             break
-        response = await Runner.run(query_agent, system_message)
+        with request_scope(query):
+            response, _ = await answer_query(query, system_message)
         print("\n=== Response ===")
         print(response)
         
         memory.save_context(
         {"input": query},
-        {"output": str(response.final_output)}
+        {"output": response}
     )
 
         while True:
@@ -46,8 +46,7 @@ async def main():
                 
                 break
             try:
-                history_docs = retriever.invoke(user_input)
-                history_text = "\n".join([doc.page_content for doc in history_docs])
+                history_text = memory.history_text(user_input)
                 print("history text retrieved")
             except Exception as e:
                 print(f"problem in retrieving: {e}")
@@ -67,9 +66,10 @@ async def main():
         {response}
         """
         
-                summary = models.gemini_llm.invoke(summary_prompt)
+                with request_scope(user_input):
+                    summary = await complete_prompt(summary_prompt, "summary")
 
-                print(summary.content)
+                print(summary)
             prompt = f"""
             You are a helpful assistant. Answer the question based on the context below.
             - Clarify user doubts with the provided context. If the answer is not in the context, instead of saying "I don't know",
@@ -83,28 +83,31 @@ async def main():
             Answer:
             """
 
-            result = models.gemini_llm.invoke(prompt)
+            with request_scope(user_input):
+                result = await complete_prompt(prompt, "follow_up")
             print("\n=== Response ===")
-            print(result.content.strip())
+            print(result)
             memory.save_context(
         {"input": query},
-        {"output": str(result.content.strip())}
+        {"output": result}
     )
 
 def cleanup():
     """Clean up database connections."""
     try:
-        if connection.neo4j_driver:
-            connection.neo4j_driver.close()
-        if mongo_connection.mongo_client:
-            mongo_connection.mongo_client.close()
+        connection.close()
+        mongo_connection.close()
         logger.info("Database connections closed successfully")
+        logger.info(format_startup_report())
+        logger.info("Token usage: %s", token_metrics.snapshot())
+        collector.flush()
+        cypher_cache.flush()
     except Exception as e:
         logger.error(f"Error during cleanup: {e}")
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        connection.run(main())
     except KeyboardInterrupt:
         print("\n🤖 Shutting down...")
     finally:
@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from services.embedding_service import embeddings, normalize_text
+from services.invalidation import on_articles_changed
+from services.request_context import current_request_context
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity of query embeddings above which a cached answer is reused
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of final answers keyed by query embedding.
+
+    A lookup returns the answer of the most similar cached query when the
+    cosine similarity reaches the threshold. Each entry records the article
+    IDs its answer was built from; `invalidate` drops every entry depending
+    on a changed article, and entries without recorded articles on any
+    change. Entries expire after the TTL and the least recently used are
+    evicted beyond `max_entries`.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # query → (unit vector, answer, article_ids, stored_at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now: float):
+        expired = [q for q, entry in self._entries.items() if now - entry[3] > self.ttl_seconds]
+        for query in expired:
+            del self._entries[query]
+
+    def lookup(self, query: str, vector) -> str | None:
+        """Cached answer for the most similar query above the threshold, or None."""
+        query = normalize_text(query)
+        unit = self._unit(vector)
+        with self._lock:
+            self._expire(time.time())
+            best, best_score = None, self.threshold
+            if query in self._entries:
+                best, best_score = query, 1.0
+            elif self._entries:
+                keys = list(self._entries)
+                scores = np.stack([self._entries[k][0] for k in keys]) @ unit
+                i = int(np.argmax(scores))
+                if scores[i] >= best_score:
+                    best, best_score = keys[i], float(scores[i])
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best][1]
+
+    def store(self, query: str, vector, answer: str, article_ids: list):
+        query = normalize_text(query)
+        with self._lock:
+            self._entries.pop(query, None)
+            self._entries[query] = (self._unit(vector), answer, {str(a) for a in article_ids}, time.time())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, article_ids: list):
+        changed = {str(a) for a in article_ids}
+        with self._lock:
+            stale = [q for q, entry in self._entries.items() if not entry[2] or entry[2] & changed]
+            for query in stale:
+                del self._entries[query]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+answer_cache = SemanticAnswerCache()
+on_articles_changed(answer_cache.invalidate)
+
+
+def _cacheable(history_text: str) -> bool:
+    # Follow-ups depend on the conversation, not only on the query
+    return ANSWER_CACHE_MAX_ENTRIES > 0 and not (history_text or "").strip()
+
+
+def cached_answer(query: str, history_text: str = "") -> str | None:
+    """
+    Return a cached answer for a query similar to `query` and mark the
+    request as served from cache. The query embedding is cached too, so a
+    miss costs nothing extra when the search embeds the same query.
+    """
+    if not _cacheable(history_text):
+        return None
+    ctx = current_request_context()
+    with ctx.timed("answer_cache") as span:
+        answer = answer_cache.lookup(query, embeddings.embed_query(query))
+        span.set(cache="miss" if answer is None else "hit")
+    if answer is not None:
+        ctx.cached = True
+        logger.info("⚡ Answer cache hit: %s", answer_cache.stats())
+    return answer
+
+
+def cache_answer(query: str, answer: str, history_text: str = ""):
+    """Store the request's final answer with the articles it was built from."""
+    ctx = current_request_context()
+    if not answer or ctx.cached or ctx.degradations or not _cacheable(history_text):
+        return
+    answer_cache.store(query, embeddings.embed_query(query), answer, ctx.article_ids)
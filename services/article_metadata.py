@@ -0,0 +1,110 @@
+"""
+Sidecar article_id → metadata index stored next to the FAISS index, used to
+filter vector search by category and publication date before ranking.
+
+article_metadata.json maps each article ID to {"category": ..., "published": "YYYY-MM-DD"}.
+It is written by ingest, or exported from the graph with:
+    python -m services.article_metadata
+"""
+import json
+import os
+import weakref
+
+METADATA_FILE = "article_metadata.json"
+
+EXPORT_CYPHER = """
+MATCH (b:Articles)-[:BELONGSTO]->(c:Category)
+RETURN b.article_id AS article_id, c.category AS category, coalesce(b.published, b.date) AS published
+"""
+
+
+class ArticleMetadataIndex:
+    def __init__(self, by_id: dict = None):
+        self.by_id = {str(k): v for k, v in (by_id or {}).items()}
+        self._positions = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def load(cls, index_path: str):
+        path = os.path.join(index_path, METADATA_FILE)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def save(self, index_path: str):
+        path = os.path.join(index_path, METADATA_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.by_id, f)
+        os.replace(tmp_path, path)
+
+    def update(self, entries: dict):
+        self.by_id.update({str(k): v for k, v in entries.items()})
+        self._positions = weakref.WeakKeyDictionary()
+
+    def matches(self, article_id: str, doc_metadata: dict = None, category: str = None,
+                date_from: str = None, date_to: str = None) -> bool:
+        """Whether an article passes the filters. Falls back to the chunk's own metadata."""
+        meta = self.by_id.get(str(article_id)) or doc_metadata or {}
+        if category and str(meta.get("category", "")).lower() != category.lower():
+            return False
+        published = str(meta.get("published") or "")
+        if date_from and (not published or published[:10] < date_from):
+            return False
+        if date_to and (not published or published[:10] > date_to):
+            return False
+        return True
+
+    def article_positions(self, store) -> dict:
+        """article_id → vector positions in `store`, computed once per loaded store."""
+        positions = self._positions.get(store)
+        if positions is None:
+            positions = {}
+            for position, doc_id in store.index_to_docstore_id.items():
+                doc = store.docstore.search(doc_id)
+                metadata = getattr(doc, "metadata", None) or {}
+                if "article_id" in metadata:
+                    positions.setdefault(str(metadata["article_id"]), []).append(position)
+            self._positions[store] = positions
+        return positions
+
+    def allowed_articles(self, store, category: str = None, date_from: str = None, date_to: str = None):
+        """IDs of the articles in `store` passing the filters, or None when no filter is set."""
+        if not (category or date_from or date_to):
+            return None
+        allowed = set()
+        for article_id, positions in self.article_positions(store).items():
+            doc = store.docstore.search(store.index_to_docstore_id[positions[0]])
+            if self.matches(article_id, getattr(doc, "metadata", None), category, date_from, date_to):
+                allowed.add(article_id)
+        return allowed
+
+    def allowed_positions(self, store, category: str = None, date_from: str = None, date_to: str = None):
+        """
+        Vector positions of the articles passing the filters, or None when no
+        filter is set.
+        """
+        articles = self.allowed_articles(store, category, date_from, date_to)
+        if articles is None:
+            return None
+        positions = self.article_positions(store)
+        return [position for article_id in articles for position in positions[article_id]]
+
+
+def export_from_graph(index_path: str) -> ArticleMetadataIndex:
+    """Write the sidecar from the Articles/Category nodes in Neo4j."""
+    from constants.connection.neo4j_connection import connection
+
+    index = ArticleMetadataIndex({
+        str(row["article_id"]): {"category": row["category"], "published": row["published"]}
+        for row in connection.read(EXPORT_CYPHER)
+    })
+    index.save(index_path)
+    return index
+
+
+if __name__ == "__main__":
+    from services.mongo_tool import FAISS_PATH
+
+    exported = export_from_graph(FAISS_PATH)
+    print(f"✅ Wrote metadata for {len(exported.by_id)} articles to {os.path.join(FAISS_PATH, METADATA_FILE)}")
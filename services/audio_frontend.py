@@ -0,0 +1,152 @@
+"""
+Audio front-end for transcription: decode, downmix to mono, resample to
+16 kHz, trim silence with an energy-based voice activity detector and pack
+the speech into chunks of at most TRANSCRIPTION_CHUNK_SECONDS that can be
+transcribed in parallel.
+
+A frame is speech when its level is VAD_MARGIN_DB above the clip's noise
+floor (its 10th percentile frame level) and above VAD_MIN_DBFS. Silences
+shorter than VAD_MIN_SILENCE_MS are kept, speech is padded by VAD_PAD_MS,
+and longer silences are cut out. Speech runs longer than a chunk are split
+at the quietest frame near the limit.
+"""
+import math
+import os
+from dataclasses import dataclass
+from io import BytesIO
+import numpy as np
+import soundfile as sf
+from dotenv import load_dotenv
+load_dotenv()
+
+try:
+    from scipy.signal import resample_poly
+except ImportError:
+    resample_poly = None
+
+# Whisper models expect 16 kHz audio
+SAMPLE_RATE = 16000
+TRANSCRIPTION_VAD = os.getenv("TRANSCRIPTION_VAD", "true").lower() == "true"
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+VAD_MIN_DBFS = float(os.getenv("VAD_MIN_DBFS", "-50"))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "300"))
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "600"))
+# Whisper decodes 30 second windows
+TRANSCRIPTION_CHUNK_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "30"))
+
+FRAME_MS = 30
+# Silence put between speech runs packed into one chunk, so words stay apart
+JOIN_MS = 150
+# How far back from the chunk limit a long speech run may be cut
+SPLIT_SEARCH_SECONDS = 5
+
+
+@dataclass
+class PreparedAudio:
+    chunks: list
+    duration: float
+    speech_seconds: float
+
+
+def decode_audio(audio_bytes: bytes) -> tuple:
+    """Decode an audio file to a float32 array (frames[, channels]) and its sample rate."""
+    audio, sample_rate = sf.read(BytesIO(audio_bytes), dtype="float32")
+    return audio, sample_rate
+
+
+def to_mono(audio: np.ndarray) -> np.ndarray:
+    return audio.mean(axis=1) if audio.ndim == 2 else audio
+
+
+def resample(audio: np.ndarray, sample_rate: int, target: int = SAMPLE_RATE) -> np.ndarray:
+    """Polyphase resampling with scipy when installed, else linear interpolation."""
+    if sample_rate == target or not len(audio):
+        return audio.astype(np.float32, copy=False)
+    if resample_poly is not None:
+        g = math.gcd(sample_rate, target)
+        return resample_poly(audio, target // g, sample_rate // g).astype(np.float32)
+    length = int(round(len(audio) * target / sample_rate))
+    positions = np.arange(length) * (sample_rate / target)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def frame_levels(audio: np.ndarray, frame: int) -> np.ndarray:
+    """RMS level in dBFS of each full `frame`-sample frame."""
+    frames = audio[:len(audio) // frame * frame].reshape(-1, frame)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_segments(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> list:
+    """(start, end) sample ranges of speech, padded and with short silences bridged."""
+    frame = sample_rate * FRAME_MS // 1000
+    levels = frame_levels(audio, frame)
+    if not len(levels):
+        return [(0, len(audio))] if len(audio) else []
+    threshold = max(np.percentile(levels, 10) + VAD_MARGIN_DB, VAD_MIN_DBFS)
+    voiced = np.flatnonzero(levels > threshold)
+    if not len(voiced):
+        return []
+
+    pad = VAD_PAD_MS // FRAME_MS
+    bridge = VAD_MIN_SILENCE_MS // FRAME_MS
+    segments = []
+    start = prev = voiced[0]
+    for i in voiced[1:]:
+        if i - prev > bridge:
+            segments.append((start, prev + 1))
+            start = i
+        prev = i
+    segments.append((start, prev + 1))
+    return [
+        (max(s - pad, 0) * frame, min((e + pad) * frame, len(audio)))
+        for s, e in segments
+    ]
+
+
+def _split_long(piece: np.ndarray, max_samples: int, sample_rate: int) -> list:
+    """Cut `piece` into runs of at most `max_samples`, at the quietest frame before each limit."""
+    frame = sample_rate * FRAME_MS // 1000
+    search = SPLIT_SEARCH_SECONDS * sample_rate
+    parts = []
+    while len(piece) > max_samples:
+        window = piece[max(max_samples - search, 0):max_samples]
+        levels = frame_levels(window, frame)
+        cut = max(max_samples - search, 0) + (int(np.argmin(levels)) * frame if len(levels) else len(window))
+        cut = cut or max_samples
+        parts.append(piece[:cut])
+        piece = piece[cut:]
+    parts.append(piece)
+    return parts
+
+
+def pack_chunks(pieces: list, max_samples: int, sample_rate: int = SAMPLE_RATE) -> list:
+    """Concatenate speech pieces, separated by a short silence, into chunks of at most `max_samples`."""
+    joiner = np.zeros(sample_rate * JOIN_MS // 1000, dtype=np.float32)
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        for part in _split_long(piece, max_samples, sample_rate):
+            added = len(part) + (len(joiner) if current else 0)
+            if current and size + added > max_samples:
+                chunks.append(np.concatenate(current))
+                current, size = [], 0
+                added = len(part)
+            if current:
+                current.append(joiner)
+            current.append(part)
+            size += added
+    if current:
+        chunks.append(np.concatenate(current))
+    return chunks
+
+
+def prepare_audio(audio_bytes: bytes, vad: bool = TRANSCRIPTION_VAD,
+                  chunk_seconds: float = TRANSCRIPTION_CHUNK_SECONDS) -> PreparedAudio:
+    """Decode `audio_bytes` into 16 kHz mono speech chunks ready for Whisper."""
+    audio, sample_rate = decode_audio(audio_bytes)
+    audio = resample(to_mono(audio), sample_rate)
+    duration = len(audio) / SAMPLE_RATE
+    segments = speech_segments(audio) if vad else [(0, len(audio))]
+    pieces = [audio[s:e] for s, e in segments if e > s]
+    chunks = pack_chunks(pieces, int(chunk_seconds * SAMPLE_RATE))
+    return PreparedAudio(chunks, duration, sum(len(p) for p in pieces) / SAMPLE_RATE)
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+import numpy as np
+from services.embedding_service import embeddings
+from services.token_budget import fit_texts, history_budget
+from dotenv import load_dotenv
+load_dotenv()
+
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "20"))
+CONVERSATION_MAX_BYTES = int(os.getenv("CONVERSATION_MAX_BYTES", str(64 * 1024)))
+CONVERSATION_IDLE_SECONDS = float(os.getenv("CONVERSATION_IDLE_SECONDS", "3600"))
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))
+
+
+class SessionMemory:
+    """
+    Conversation history of one chat session, kept apart from the article
+    index. Holds at most `max_turns` turns and `max_bytes` of text, dropping
+    the oldest turns first, and searches only this session's turns.
+    """
+
+    def __init__(self, max_turns: int = CONVERSATION_MAX_TURNS, max_bytes: int = CONVERSATION_MAX_BYTES):
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.last_used = time.monotonic()
+        self._turns = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._turns)
+
+    def save_context(self, inputs: dict, outputs: dict):
+        """Store one turn, formatted like VectorStoreRetrieverMemory does."""
+        text = "\n".join(f"{k}: {v}" for k, v in {**inputs, **outputs}.items())
+        vector = np.asarray(embeddings.embed_query(text), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            self.last_used = time.monotonic()
+            self._turns.append((text, vector, size))
+            self.size_bytes += size
+            while self._turns and (len(self._turns) > self.max_turns or self.size_bytes > self.max_bytes):
+                _, _, dropped = self._turns.popleft()
+                self.size_bytes -= dropped
+
+    def relevant_history(self, query: str, k: int = 5, max_tokens: int = None) -> list:
+        """
+        The `k` turns most similar to `query`, most similar first, cut to
+        `max_tokens` (the prompt's history budget by default).
+        """
+        with self._lock:
+            self.last_used = time.monotonic()
+            turns = list(self._turns)
+        if not turns:
+            return []
+        query_vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        scores = np.stack([vector for _, vector, _ in turns]) @ query_vector
+        ranked = [turns[i][0] for i in np.argsort(-scores)[:k]]
+        return fit_texts(ranked, history_budget() if max_tokens is None else max_tokens)
+
+    def history_text(self, query: str, k: int = 5, max_tokens: int = None) -> str:
+        return "\n".join(self.relevant_history(query, k, max_tokens))
+
+    async def asave_context(self, inputs: dict, outputs: dict):
+        await asyncio.to_thread(self.save_context, inputs, outputs)
+
+    async def ahistory_text(self, query: str, k: int = 5, max_tokens: int = None) -> str:
+        return await asyncio.to_thread(self.history_text, query, k, max_tokens)
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
+            self.size_bytes = 0
+
+
+class ConversationStore:
+    """
+    Per-session conversation memories. Sessions idle for longer than
+    `idle_seconds` are evicted, and the least recently used session is
+    evicted once `max_sessions` is exceeded.
+    """
+
+    def __init__(self, idle_seconds: float = CONVERSATION_IDLE_SECONDS, max_sessions: int = CONVERSATION_MAX_SESSIONS):
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> SessionMemory:
+        with self._lock:
+            self._evict_idle()
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = SessionMemory()
+                self._sessions[session_id] = memory
+            self._sessions.move_to_end(session_id)
+            memory.last_used = time.monotonic()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return memory
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        for session_id in [s for s, m in self._sessions.items() if m.last_used < cutoff]:
+            del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+conversation_store = ConversationStore()
@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.getenv(
+    "CYPHER_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cypher_cache.json"),
+)
+CACHE_MAX_ENTRIES = int(os.getenv("CYPHER_CACHE_MAX_ENTRIES", "1000"))
+CACHE_TTL_SECONDS = float(os.getenv("CYPHER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Changes are written to disk by a background thread at most this often;
+# 0 writes on every change
+CACHE_FLUSH_SECONDS = float(os.getenv("CYPHER_CACHE_FLUSH_SECONDS", "5"))
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case, strip punctuation and collapse whitespace so trivially different phrasings share a key."""
+    text = re.sub(r"[^\w\s]", " ", (question or "").lower())
+    return " ".join(text.split())
+
+
+class CypherCache:
+    """
+    LRU + TTL cache of LLM-generated Cypher that has already run successfully,
+    keyed by normalized question and persisted to a JSON file across restarts.
+    Lookups and updates never touch the disk: a background thread writes
+    pending changes every `flush_seconds`, and `flush()` writes them at
+    shutdown.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS,
+                 flush_seconds: float = CACHE_FLUSH_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.flush_seconds = flush_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes writers of the file, outside the entries lock
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._flusher = None
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Ignoring unreadable Cypher cache %s: %s", self.path, e)
+            return
+        now = time.time()
+        for key, entry in stored.get("entries", []):
+            if now - entry["created_at"] < self.ttl_seconds:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _schedule_flush(self):
+        """Write a change now when flushing is disabled, else leave it to the background thread."""
+        if not self.path:
+            return
+        if self.flush_seconds <= 0:
+            self.flush()
+            return
+        if self._flusher is not None:
+            return
+        with self._save_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="cypher-cache-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        """Write the entries to disk if they changed since the last write."""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty or not self.path:
+                    return
+                entries = list(self._entries.items())
+                self._dirty = False
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump({"entries": entries}, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning("⚠️ Could not persist Cypher cache: %s", e)
+                with self._lock:
+                    self._dirty = True
+
+    def get(self, question: str) -> str | None:
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry["created_at"] >= self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["cypher"]
+
+    def put(self, question: str, cypher: str):
+        key = normalize_question(question)
+        if not key or not cypher:
+            return
+        with self._lock:
+            self._entries[key] = {"cypher": cypher, "created_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+        self._schedule_flush()
+
+    def invalidate(self, question: str):
+        with self._lock:
+            if self._entries.pop(normalize_question(question), None) is None:
+                return
+            self._dirty = True
+        self._schedule_flush()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+        self._schedule_flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+cypher_cache = CypherCache()
@@ -0,0 +1,137 @@
+import re
+
+# Precompiled, parameterized queries over the fixed
+# (Author)-[:WROTE]->(Articles)-[:BELONGSTO]->(Category) schema. The Cypher text
+# never changes between calls, so Neo4j reuses the cached query plan and only
+# the parameters differ.
+SCHEMA_MATCH = "MATCH (a:Author)-[:WROTE]->(b:Articles)-[:BELONGSTO]->(c:Category)"
+ARTICLE_RETURN = (
+    "RETURN b.article_id AS article_id, b.title AS title, b.refLink AS refLink, "
+    "a.author AS author, c.category AS category"
+)
+
+TEMPLATES = {
+    "articles_by_ids": f"""
+{SCHEMA_MATCH}
+WHERE b.article_id IN $ids
+{ARTICLE_RETURN}
+""",
+    "articles_by_author": f"""
+{SCHEMA_MATCH}
+WHERE toLower(a.author) = toLower($author)
+{ARTICLE_RETURN}
+""",
+    "articles_by_category": f"""
+{SCHEMA_MATCH}
+WHERE c.category = $category
+{ARTICLE_RETURN}
+""",
+    "articles_by_author_and_category": f"""
+{SCHEMA_MATCH}
+WHERE toLower(a.author) = toLower($author) AND c.category = $category
+{ARTICLE_RETURN}
+""",
+}
+
+# Words that end an author name or category phrase ("category with more
+# articles", "by asha rao in technology") instead of being part of it.
+STOP_WORDS = (
+    "a", "about", "after", "all", "an", "and", "are", "article", "articles", "before", "by", "category",
+    "date", "do", "does", "for", "from", "has", "have", "in", "is", "least", "less", "more", "most",
+    "news", "of", "on", "or", "published", "since", "than", "that", "the", "this", "to", "was", "were",
+    "which", "with", "written", "wrote",
+)
+# Words a plain "list the articles by/in/with ..." request may contain besides
+# the author, category or article IDs. Any other word left in the question
+# (counts, rankings, topics, dates) needs a generated query.
+LISTING_WORDS = {
+    "a", "all", "an", "and", "any", "are", "article", "articles", "author", "by", "can", "category", "could",
+    "do", "fetch", "find", "for", "from", "get", "give", "i", "id", "ids", "in", "is", "link", "links",
+    "list", "me", "named", "news", "of", "please", "published", "reflink", "reflinks", "search", "see",
+    "show", "stories", "story", "the", "their", "there", "title", "titles", "to", "under", "url", "urls",
+    "want", "what", "which", "with", "written", "wrote", "you",
+}
+
+_NOT_STOP = r"(?!(?:%s)\b)" % "|".join(STOP_WORDS)
+_NAME_WORD = _NOT_STOP + r"[\w.'-]+"
+_CATEGORY_WORD = _NOT_STOP + r"[\w&-]+"
+
+IDS_PATTERN = re.compile(r"\barticle[_ ]?ids?\b[^\d\[]*\[?((?:['\"]?\d+['\"]?\s*,?\s*(?:and\s+)?)+)", re.IGNORECASE)
+AUTHOR_PATTERN = re.compile(
+    rf"\b(?:by|author|written by|wrote by)\s+(?:named\s+|is\s+)?['\"]?({_NAME_WORD}(?:\s+{_NAME_WORD}){{0,3}})['\"]?",
+    re.IGNORECASE,
+)
+CATEGORY_PATTERNS = [
+    re.compile(rf"\bcategory\s*(?:is|=|:|of|named|called)?\s*['\"]?({_CATEGORY_WORD}(?:\s{_CATEGORY_WORD}){{0,2}})['\"]?", re.IGNORECASE),
+    re.compile(rf"\b(?:in|under|from)\s+(?:the\s+)?['\"]?({_CATEGORY_WORD}(?:\s{_CATEGORY_WORD}){{0,2}})['\"]?\s+category\b", re.IGNORECASE),
+]
+
+
+def _category_match(question: str):
+    for pattern in CATEGORY_PATTERNS:
+        match = pattern.search(question or "")
+        if match:
+            return match
+    return None
+
+
+def extract_article_ids(question: str) -> list:
+    match = IDS_PATTERN.search(question or "")
+    if not match:
+        return []
+    return re.findall(r"\d+", match.group(1))
+
+
+def extract_author(question: str) -> str | None:
+    match = AUTHOR_PATTERN.search(question or "")
+    return match.group(1).strip().rstrip(".") if match else None
+
+
+def extract_category(question: str) -> str | None:
+    match = _category_match(question)
+    return match.group(1).strip().lower() if match else None
+
+
+def leftover_terms(question: str) -> list:
+    """
+    Words of the question outside its article IDs, author and category
+    phrases that are not part of a plain listing request.
+    """
+    text = question or ""
+    matches = [IDS_PATTERN.search(text), AUTHOR_PATTERN.search(text), _category_match(text)]
+    for match in sorted((m for m in matches if m), key=lambda m: -m.start()):
+        text = text[:match.start()] + " " + text[match.end():]
+    words = (w.strip(".'-") for w in re.findall(r"[\w.'-]+", text.lower()))
+    return [w for w in words if w and w not in LISTING_WORDS]
+
+
+def match_template(question: str = None, article_ids: list = None, author: str = None, category: str = None):
+    """
+    Pick a precompiled template for the request and bind its parameters locally.
+
+    Explicit arguments take precedence over values extracted from the
+    question. Extracted values are only used when nothing else is left in the
+    question: "how many articles are in the technology category" or "news by
+    reuters about tesla" need more than a listing and go to Cypher
+    generation.
+
+    Returns:
+        tuple: (template_name, cypher, params), or None when no template fits and
+        the caller should fall back to LLM Cypher generation.
+    """
+    plain = bool(question) and not leftover_terms(question)
+    ids = [str(a) for a in (article_ids or [])] or (extract_article_ids(question) if plain else [])
+    if ids:
+        return "articles_by_ids", TEMPLATES["articles_by_ids"], {"ids": ids}
+
+    author = (author or (extract_author(question) if plain else None) or "").strip()
+    category = (category or (extract_category(question) if plain else None) or "").strip().lower()
+
+    if author and category:
+        name = "articles_by_author_and_category"
+        return name, TEMPLATES[name], {"author": author, "category": category}
+    if author:
+        return "articles_by_author", TEMPLATES["articles_by_author"], {"author": author}
+    if category:
+        return "articles_by_category", TEMPLATES["articles_by_category"], {"category": category}
+    return None
@@ -0,0 +1,99 @@
+"""
+Deadline propagation for the request path.
+
+Every tool, database and LLM call made while serving a request gets at
+most the time left on the request's deadline (see RequestContext). When the
+budget runs short the pipeline degrades in fixed steps instead of hanging:
+refinement is skipped, the answer falls back to the retrieved summaries, or
+to the Neo4j rows without prose. Each step taken is recorded in
+`RequestContext.degradations`.
+"""
+import asyncio
+import os
+from services.request_context import current_request_context
+
+# Least time left for which an optional stage is still started
+REFINE_MIN_SECONDS = float(os.getenv("REFINE_MIN_SECONDS", "4"))
+SYNTHESIS_MIN_SECONDS = float(os.getenv("SYNTHESIS_MIN_SECONDS", "3"))
+# Time kept back from a stage's timeout for the fallback after it
+DEADLINE_RESERVE_SECONDS = float(os.getenv("DEADLINE_RESERVE_SECONDS", "0.5"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before a stage finished."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded during {stage}")
+        self.stage = stage
+
+
+def time_left(reserve: float = 0.0) -> float | None:
+    """
+    Seconds a blocking call may take, `reserve` seconds before the deadline;
+    None when the request has no deadline. Raises DeadlineExceeded when no
+    time is left at all.
+    """
+    remaining = current_request_context().remaining()
+    if remaining == float("inf"):
+        return None
+    if remaining - reserve <= 0:
+        raise DeadlineExceeded("scheduling")
+    return remaining - reserve
+
+
+def has_time_for(min_seconds: float) -> bool:
+    return current_request_context().remaining() >= min_seconds
+
+
+async def with_deadline(awaitable, stage: str, reserve: float = DEADLINE_RESERVE_SECONDS):
+    """Await `awaitable`, cancelling it when the request's deadline (minus `reserve`) passes."""
+    try:
+        timeout = time_left(reserve)
+    except DeadlineExceeded:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(stage)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(stage) from None
+
+
+async def iterate_with_deadline(aiterator, stage: str, reserve: float = DEADLINE_RESERVE_SECONDS):
+    """Async-iterate `aiterator`, raising DeadlineExceeded when the next item is late."""
+    aiterator = aiter(aiterator)
+    try:
+        while True:
+            try:
+                item = await with_deadline(anext(aiterator), stage, reserve)
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        close = getattr(aiterator, "aclose", None)
+        if close is not None:
+            await close()
+
+
+def degraded_answer() -> str:
+    """
+    Best answer assembled without another LLM call from what the request has
+    retrieved so far: the summaries (with their articles' links), else the
+    Neo4j rows without prose.
+    """
+    ctx = current_request_context()
+    links = "\n".join(
+        f"- [{row.get('title') or row.get('refLink')}]({row.get('refLink')})"
+        + (f" by {row['author']}" if row.get("author") else "")
+        + (f" ({row['category']})" if row.get("category") else "")
+        for row in ctx.neo4j_rows if isinstance(row, dict) and row.get("refLink")
+    )
+    if ctx.summaries:
+        ctx.degrade("summaries_only")
+        answer = "Here is what the most relevant articles say:\n\n" + "\n\n".join(f"- {s}" for s in ctx.summaries)
+        return answer + (f"\n\n**Related Articles:**\n{links}" if links else "")
+    if ctx.neo4j_rows:
+        ctx.degrade("neo4j_rows_only")
+        return "**Matching articles:**\n" + (links or "\n".join(f"- {row}" for row in ctx.neo4j_rows))
+    ctx.degrade("no_answer")
+    return "Sorry, I could not find an answer in time. Please try again or narrow the question."
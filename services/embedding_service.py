@@ -0,0 +1,166 @@
+import asyncio
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from constants.resources import lazy_resource
+from dotenv import load_dotenv
+load_dotenv()
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+
+
+def normalize_text(text: str) -> str:
+    """
+    Cache key for a text. Unicode form and whitespace are normalized; case is
+    kept because the sentence-transformer models are case sensitive.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+class _EmbeddingBatcher:
+    """
+    Collects embed requests arriving from concurrent threads within a short
+    window and embeds them in one model forward pass.
+    """
+
+    def __init__(self, embed_documents, max_batch: int, window_seconds: float):
+        self._embed_documents = embed_documents
+        self._max_batch = max_batch
+        self._window = window_seconds
+        self._pending = []
+        self._cond = threading.Condition()
+        self._worker = None
+        self.batches = 0
+        self.batched_texts = 0
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        with self._cond:
+            self._pending.append((text, future))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self._window
+                while len(self._pending) < self._max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self._max_batch]
+                del self._pending[:self._max_batch]
+
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = dict(zip(texts, self._embed_documents(texts)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.batched_texts += len(texts)
+            for text, future in batch:
+                future.set_result(vectors[text])
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an LRU cache keyed by normalized text. Query
+    embeddings requested concurrently are micro-batched into one forward pass.
+    """
+
+    def __init__(self, base_factory, cache_size: int = EMBEDDING_CACHE_SIZE,
+                 batch_size: int = EMBEDDING_BATCH_SIZE, batch_window_ms: float = EMBEDDING_BATCH_WINDOW_MS):
+        self._base_factory = base_factory
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._batcher = _EmbeddingBatcher(lambda texts: self.base.embed_documents(texts), batch_size, batch_window_ms / 1000)
+
+    @property
+    def base(self) -> Embeddings:
+        """The wrapped model, created on first use."""
+        return self._base_factory()
+
+    def _get(self, key: str):
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def _put(self, key: str, vector: list):
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def cached(self, text: str) -> bool:
+        """Whether `text`'s embedding is cached, without counting a hit or miss."""
+        with self._lock:
+            return normalize_text(text) in self._cache
+
+    def embed_query(self, text: str) -> list:
+        key = normalize_text(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = self._batcher.submit(key).result()
+            self._put(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> list:
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def embed_documents(self, texts: list) -> list:
+        keys = [normalize_text(t) for t in texts]
+        vectors = [self._get(k) for k in keys]
+        missing = list(dict.fromkeys(k for k, v in zip(keys, vectors) if v is None))
+        if missing:
+            embedded = dict(zip(missing, self.base.embed_documents(missing)))
+            for key, vector in embedded.items():
+                self._put(key, vector)
+            vectors = [v if v is not None else embedded[k] for k, v in zip(keys, vectors)]
+        return vectors
+
+    async def aembed_documents(self, texts: list) -> list:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "batches": self._batcher.batches,
+                "batched_texts": self._batcher.batched_texts,
+            }
+
+
+@lazy_resource("embedding_model")
+def get_embedding_model():
+    return HuggingFaceEmbeddings()
+
+
+embeddings = CachedEmbeddings(get_embedding_model)
@@ -0,0 +1,196 @@
+"""
+Incremental article ingest.
+
+Each batch of articles is chunked and embedded in batches, appended to the
+FAISS index, upserted into `news_db.summaries` and the Author/Articles/Category
+graph in bulk, and the rewritten index is swapped into this process without a
+restart. Other running servers pick the new index up on their next search
+(see `refresh_vector_store`), and caches of the ingested articles are
+invalidated everywhere.
+
+An article is a dict with article_id, title, refLink, author, category,
+published (YYYY-MM-DD), summary and optional content (defaults to summary).
+
+Usage:
+    python -m services.ingest articles.jsonl
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from pymongo import UpdateOne
+from constants.connection.mongodb_connection import mongo_connection
+from constants.connection.neo4j_connection import connection
+from services.article_metadata import ArticleMetadataIndex
+from services.embedding_service import embeddings
+from services.invalidation import articles_changed
+from services.mongo_tool import FAISS_PATH, INGEST_LOG_FILE, load_vector_store, swap_vector_store
+from services.vector_index import load_index, read_meta, store_documents, write_index
+from dotenv import load_dotenv
+load_dotenv()
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1000"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "100"))
+
+UPSERT_GRAPH_CYPHER = """
+UNWIND $rows AS row
+MERGE (b:Articles {article_id: row.article_id})
+SET b.title = row.title, b.refLink = row.refLink, b.published = row.published
+MERGE (a:Author {author: row.author})
+MERGE (c:Category {category: row.category})
+MERGE (a)-[:WROTE]->(b)
+MERGE (b)-[:BELONGSTO]->(c)
+"""
+
+# The index files are rewritten as a whole, so one ingest at a time per process.
+_ingest_lock = threading.Lock()
+
+
+def chunk_articles(articles: list) -> list:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=INGEST_CHUNK_SIZE, chunk_overlap=INGEST_CHUNK_OVERLAP)
+    documents = []
+    for article in articles:
+        metadata = {
+            "article_id": str(article["article_id"]),
+            "title": article.get("title"),
+            "category": (article.get("category") or "").lower(),
+            "published": article.get("published"),
+        }
+        text = article.get("content") or article.get("summary") or ""
+        for chunk in splitter.split_text(text):
+            documents.append(Document(page_content=chunk, metadata=dict(metadata)))
+    return documents
+
+
+def embed_in_batches(documents: list, batch_size: int = INGEST_BATCH_SIZE) -> np.ndarray:
+    vectors = []
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        vectors.extend(embeddings.embed_documents([d.page_content for d in batch]))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def upsert_summaries(articles: list):
+    operations = []
+    for article in articles:
+        article_id = str(article["article_id"])
+        stored_id = int(article_id) if article_id.isdigit() else article_id
+        operations.append(UpdateOne(
+            {"article_id": stored_id},
+            {"$set": {"article_id": stored_id, "summary.summary": article.get("summary", "")}},
+            upsert=True,
+        ))
+    if operations:
+        mongo_connection.summaries().bulk_write(operations, ordered=False)
+
+
+def upsert_graph(articles: list):
+    rows = [{
+        "article_id": str(a["article_id"]),
+        "title": a.get("title"),
+        "refLink": a.get("refLink"),
+        "published": a.get("published"),
+        "author": a.get("author") or "unknown",
+        "category": (a.get("category") or "uncategorized").lower(),
+    } for a in articles]
+    if rows:
+        connection.write(UPSERT_GRAPH_CYPHER, {"rows": rows})
+
+
+def append_to_index(articles: list, version: str):
+    """
+    Append the articles' chunks to a writable copy of the on-disk index and
+    write it back. Chunks from earlier ingests of the same articles are
+    dropped so re-ingesting updates an article instead of duplicating it.
+    """
+    article_ids = {str(a["article_id"]) for a in articles}
+    documents = chunk_articles(articles)
+    vectors = embed_in_batches(documents)
+
+    store = load_index(FAISS_PATH, embeddings, mmap=False)
+    for position, doc_id in list(store.index_to_docstore_id.items()):
+        doc = store.docstore.search(doc_id)
+        if str(getattr(doc, "metadata", {}).get("article_id")) in article_ids:
+            del store.index_to_docstore_id[position]
+
+    start = store.index.ntotal
+    if len(vectors):
+        store.index.add(vectors)
+    new_docs = {}
+    for offset, doc in enumerate(documents):
+        doc_id = str(uuid.uuid4())
+        new_docs[doc_id] = doc
+        store.index_to_docstore_id[start + offset] = doc_id
+    store.docstore.add(new_docs)
+
+    meta = read_meta(FAISS_PATH)
+    write_index(FAISS_PATH, store.index, store_documents(store), meta["kind"], meta["spec"], version)
+
+
+def update_metadata_index(articles: list) -> ArticleMetadataIndex:
+    metadata = ArticleMetadataIndex.load(FAISS_PATH)
+    metadata.update({
+        str(a["article_id"]): {"category": (a.get("category") or "").lower(), "published": a.get("published")}
+        for a in articles
+    })
+    metadata.save(FAISS_PATH)
+    return metadata
+
+
+def log_ingest(version: str, article_ids: list):
+    """
+    Record which articles an index version changes, for other servers'
+    caches. Written before the index so a server that sees the new version
+    always finds its entry.
+    """
+    with open(os.path.join(FAISS_PATH, INGEST_LOG_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"version": version, "article_ids": article_ids}) + "\n")
+
+
+def ingest_articles(articles: list, batch_size: int = INGEST_BATCH_SIZE) -> int:
+    """
+    Ingest articles in batches of `batch_size`.
+
+    Summaries and graph nodes are written before the index, so an article is
+    never found by vector search before its summary and metadata exist.
+
+    Returns:
+        int: Number of articles ingested.
+    """
+    with _ingest_lock:
+        for start in range(0, len(articles), batch_size):
+            batch = articles[start:start + batch_size]
+            article_ids = [str(a["article_id"]) for a in batch]
+
+            upsert_summaries(batch)
+            upsert_graph(batch)
+            metadata = update_metadata_index(batch)
+            version = str(time.time_ns())
+            log_ingest(version, article_ids)
+            append_to_index(batch, version)
+
+            swap_vector_store(load_vector_store(), metadata)
+            articles_changed(article_ids)
+            print(f"✅ Ingested {len(batch)} articles ({start + len(batch)}/{len(articles)})")
+    return len(articles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="JSON Lines file with one article per line")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        articles = [json.loads(line) for line in f if line.strip()]
+    ingest_articles(articles, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Registry of caches that depend on article content. Ingest, and servers
+picking up an index rewritten by another process, call `articles_changed`
+so every registered cache drops what it holds for those articles.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+_callbacks = []
+
+
+def on_articles_changed(callback):
+    """Register `callback(article_ids)`; usable as a decorator."""
+    _callbacks.append(callback)
+    return callback
+
+
+def articles_changed(article_ids: list):
+    article_ids = [str(a) for a in article_ids]
+    for callback in _callbacks:
+        try:
+            callback(article_ids)
+        except Exception as e:
+            logger.warning("Cache invalidation via %s failed: %s", getattr(callback, "__qualname__", callback), e)
@@ -0,0 +1,151 @@
+"""
+In-process BM25 inverted index over article titles and text, used next to
+the FAISS index for exact-name queries ("Helm.ai", "Drive AGX Thor") that
+dense retrieval tends to miss.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+# Words that do not make a query about a specific name
+STOPWORDS = {
+    "a", "an", "and", "are", "about", "any", "articles", "by", "did", "do", "does", "for", "from",
+    "has", "have", "how", "in", "is", "it", "latest", "me", "news", "of", "on", "show", "tell",
+    "the", "to", "what", "whats", "when", "which", "who", "with",
+}
+
+
+def tokenize(text: str) -> list:
+    """Lower-case terms; dotted or hyphenated names also yield their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        tokens.append(token)
+        if "." in token or "-" in token:
+            tokens.extend(p for p in re.split(r"[.\-]", token) if p)
+    return tokens
+
+
+def name_terms(query: str) -> list:
+    """
+    Terms of the query that look like proper names: containing a dot or
+    digit, or written with a capital letter anywhere but a sentence start.
+    """
+    names = []
+    words = re.findall(r"[\w.\-]+", query or "")
+    for i, word in enumerate(words):
+        stripped = word.strip(".-")
+        if not stripped or stripped.lower() in STOPWORDS:
+            continue
+        if "." in stripped or any(c.isdigit() for c in stripped) or (i > 0 and stripped[0].isupper()) or stripped[1:] != stripped[1:].lower():
+            names.append(stripped.lower())
+    return names
+
+
+def is_exact_name(word: str) -> bool:
+    """
+    A token no dictionary word looks like: dotted ("Helm.ai"), letters mixed
+    with digits ("A100", "GPT-4"), several capitals ("AGX") or camel case
+    ("iPhone", "OpenAI").
+    Capitalized words ("Nvidia", "Tesla") and short acronyms ("AI") are not.
+    """
+    word = word.strip(".-")
+    if "." in word:
+        return True
+    if any(c.isdigit() for c in word) and any(c.isalpha() for c in word):
+        return True
+    return (len(word) >= 3 and sum(c.isupper() for c in word) >= 2) or bool(re.search(r"[a-z][A-Z]", word))
+
+
+def is_name_query(query: str, max_terms: int = 4) -> bool:
+    """
+    A short query that is mostly names, at least one of them an exact-name
+    token, e.g. "Helm.ai" or "Drive AGX Thor", which lexical lookup can
+    answer without dense retrieval. Topic questions such as "Who is Elon
+    Musk" or "latest news on Tesla" are not.
+    """
+    words = re.findall(r"[\w.\-]+", query or "")
+    content = [w for w in words if w.strip(".-").lower() not in STOPWORDS]
+    names = name_terms(query)
+    return (
+        bool(names) and len(content) <= max_terms and 2 * len(names) >= len(content)
+        and any(is_exact_name(w) for w in content)
+    )
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.doc_lengths = {}
+        self.avg_length = 0.0
+
+    @classmethod
+    def build(cls, texts: dict, **kwargs):
+        """Index a mapping of article_id → text."""
+        index = cls(**kwargs)
+        for article_id, text in texts.items():
+            counts = Counter(tokenize(text))
+            index.doc_lengths[article_id] = sum(counts.values())
+            for term, tf in counts.items():
+                index.postings[term][article_id] = tf
+        index.avg_length = sum(index.doc_lengths.values()) / max(len(index.doc_lengths), 1)
+        return index
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.doc_lengths) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 10, required_terms: list = None) -> list:
+        """
+        Rank articles by BM25 score for the query.
+
+        Args:
+            required_terms: Terms every returned article must contain.
+
+        Returns:
+            list: (article_id, score) pairs, best first.
+        """
+        terms = [t for t in tokenize(query) if t not in STOPWORDS]
+        scores = defaultdict(float)
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for article_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[article_id] / (self.avg_length or 1))
+                scores[article_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        if required_terms:
+            for term in required_terms:
+                holders = self.postings.get(term, {})
+                scores = {a: s for a, s in scores.items() if a in holders}
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def build_from_store(store) -> BM25Index:
+    """Index each article's title and chunk texts from a loaded FAISS store."""
+    texts = defaultdict(list)
+    for doc_id in store.index_to_docstore_id.values():
+        doc = store.docstore.search(doc_id)
+        metadata = getattr(doc, "metadata", None) or {}
+        if "article_id" not in metadata:
+            continue
+        article_id = str(metadata["article_id"])
+        if not texts[article_id] and metadata.get("title"):
+            texts[article_id].append(metadata["title"])
+        texts[article_id].append(doc.page_content)
+    return BM25Index.build({a: "\n".join(parts) for a, parts in texts.items()})
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """Fuse ranked ID lists; an ID's score is the sum of 1 / (k + rank) over the lists."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda item: -scores[item])
@@ -0,0 +1,121 @@
+"""
+Per-provider limits on concurrent LLM calls.
+
+Every LLM call on the request path runs inside `llm_slot(provider)`. At
+most GEMINI_MAX_CONCURRENCY / GROQ_MAX_CONCURRENCY calls per provider are
+in flight; further callers queue in arrival order until a slot frees up or
+their request's deadline passes, so a burst of users is smoothed out instead
+of tripping the provider's rate limits. Time spent queuing is recorded as an
+"llm_queue" span.
+
+Limits hold per event loop: the Chainlit server shares one loop between all
+users, while every Streamlit `asyncio.run` gets its own.
+"""
+import asyncio
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from agents import Model, MultiProvider
+from services.deadline import with_deadline
+from services.request_context import current_request_context
+from dotenv import load_dotenv
+load_dotenv()
+
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+
+
+class ProviderLimiter:
+    """Bounds one provider's in-flight calls; callers past the limit wait their turn."""
+
+    def __init__(self, provider: str, max_concurrency: int):
+        self.provider = provider
+        self.max_concurrency = max(max_concurrency, 1)
+        self.calls = 0
+        self.queued = 0
+        self.active = 0
+        self.waiting = 0
+        # asyncio primitives belong to the loop they are first used on
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        semaphore = self._semaphore()
+        if semaphore.locked():
+            self.queued += 1
+            self.waiting += 1
+            start = time.perf_counter()
+            try:
+                await with_deadline(semaphore.acquire(), f"{self.provider}_queue")
+            finally:
+                self.waiting -= 1
+                current_request_context().add_span(
+                    "llm_queue", start, time.perf_counter() - start, provider=self.provider,
+                )
+        else:
+            await semaphore.acquire()
+        self.calls += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.max_concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "queued": self.queued,
+        }
+
+
+limiters = {
+    "gemini": ProviderLimiter("gemini", GEMINI_MAX_CONCURRENCY),
+    "groq": ProviderLimiter("groq", GROQ_MAX_CONCURRENCY),
+}
+
+
+def llm_slot(provider: str):
+    """`async with llm_slot("gemini"):` around one call to the provider."""
+    return limiters[provider].slot()
+
+
+def limiter_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+class LimitedModel(Model):
+    """
+    Agents SDK model whose calls take a slot of `provider`. `model` is a
+    model name, resolved like the Runner does on first use, or a Model.
+    """
+
+    def __init__(self, model, provider: str):
+        self.provider = provider
+        self._model = model
+
+    @property
+    def model(self) -> Model:
+        if isinstance(self._model, str):
+            self._model = MultiProvider().get_model(self._model)
+        return self._model
+
+    async def get_response(self, *args, **kwargs):
+        async with llm_slot(self.provider):
+            return await self.model.get_response(*args, **kwargs)
+
+    async def stream_response(self, *args, **kwargs):
+        async with llm_slot(self.provider):
+            async for event in self.model.stream_response(*args, **kwargs):
+                yield event
@@ -6,21 +6,317 @@ from agents import (
 from langchain_core.tools import tool
 # from constants.vectorStore import vector_store
 from langchain.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.memory import VectorStoreRetrieverMemory
 from constants.connection.mongodb_connection import mongo_connection
+from services.summary_cache import summary_cache
+from services.embedding_service import embeddings
+from constants.resources import lazy_resource
+from services.vector_index import load_index, search_params, index_version
+from services.invalidation import articles_changed
+from services.article_metadata import ArticleMetadataIndex
+from services.lexical_index import build_from_store, is_name_query, name_terms, reciprocal_rank_fusion
+from services.request_context import current_request_context
+from services.deadline import time_left, with_deadline
+from services.token_budget import account, fit_tool_output
+import asyncio
 import json
+import logging
 import os
+import threading
+import time
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 FAISS_PATH = os.path.join(BASE_DIR, "faiss_index")
-vector_store =  FAISS.load_local(FAISS_PATH,embeddings=HuggingFaceEmbeddings(),allow_dangerous_deserialization=True)
+# Chunks fetched per requested article, so several chunks of one article
+# ranking high still leave k distinct articles after grouping.
+SEARCH_OVERFETCH = int(os.getenv("SEARCH_OVERFETCH", "4"))
+SEARCH_MMR_LAMBDA = float(os.getenv("SEARCH_MMR_LAMBDA", "0.5"))
+# How often a running server checks whether ingest rewrote the index on disk
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "10"))
+INGEST_LOG_FILE = "ingest_log.jsonl"
+# Fuse BM25 results over titles and text with the dense results
+SEARCH_HYBRID = os.getenv("SEARCH_HYBRID", "true").lower() == "true"
+
+
+def load_vector_store():
+    """Load the index from FAISS_PATH, tagged with the on-disk version it was read at."""
+    version = index_version(FAISS_PATH)
+    store = load_index(FAISS_PATH, embeddings)
+    store.index_version = version
+    return store
+
+
+@lazy_resource("faiss_index")
+def get_vector_store():
+    return load_vector_store()
+
+
+@lazy_resource("article_metadata")
+def get_article_metadata():
+    return ArticleMetadataIndex.load(FAISS_PATH)
+
+
+@lazy_resource("lexical_index")
+def get_lexical_index():
+    return build_from_store(get_vector_store())
+
+
+def swap_vector_store(store, metadata: ArticleMetadataIndex = None):
+    """
+    Atomically replace the index served by this process. Searches already
+    running finish on the previous store.
+    """
+    lexical = build_from_store(store) if SEARCH_HYBRID else None
+    get_article_metadata.set(metadata or ArticleMetadataIndex.load(FAISS_PATH))
+    if lexical is not None:
+        get_lexical_index.set(lexical)
+    get_vector_store.set(store)
+
+
+def changed_article_ids(since_version: str) -> list:
+    """Article IDs ingested after `since_version`, from the ingest log."""
+    path = os.path.join(FAISS_PATH, INGEST_LOG_FILE)
+    if not os.path.exists(path):
+        return []
+    since = int(since_version or 0)
+    changed = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if int(entry["version"]) > since:
+                changed.extend(entry["article_ids"])
+    return changed
+
+
+_reload_lock = threading.Lock()
+_last_reload_check = 0.0
+
+
+def refresh_vector_store(force: bool = False) -> bool:
+    """
+    Hot-swap the index if another process rewrote it since it was loaded,
+    and invalidate the caches of the articles that changed. Checks the disk
+    at most every INDEX_RELOAD_INTERVAL seconds unless forced.
+
+    Returns:
+        bool: True if a new index was swapped in.
+    """
+    global _last_reload_check
+    if not get_vector_store.loaded:
+        return False
+    now = time.monotonic()
+    if not force and now - _last_reload_check < INDEX_RELOAD_INTERVAL:
+        return False
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    try:
+        _last_reload_check = now
+        current = get_vector_store()
+        loaded_version = getattr(current, "index_version", "")
+        if index_version(FAISS_PATH) == loaded_version:
+            return False
+        store = load_vector_store()
+        swap_vector_store(store)
+        articles_changed(changed_article_ids(loaded_version))
+        logger.info("🔄 Reloaded vector index version %s", store.index_version)
+        return True
+    finally:
+        _reload_lock.release()
+
+
+def _candidate_relevance(query_vector: np.ndarray, candidates: list, store):
+    """
+    Unit vectors of the candidates' chunks and their cosine similarity to the
+    query, or (None, None) when the index cannot reconstruct vectors (e.g.
+    IVF without direct map).
+    """
+    try:
+        vectors = np.stack([store.index.reconstruct(int(pos)) for _, (_, pos) in candidates])
+    except RuntimeError:
+        return None, None
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    query = query_vector[0] / (np.linalg.norm(query_vector[0]) + 1e-12)
+    return vectors, vectors @ query
+
+
+def _mmr(query_vector: np.ndarray, candidates: list, store, k: int, lambda_mult: float) -> list:
+    """Maximal marginal relevance over one candidate chunk per article."""
+    vectors, relevance = _candidate_relevance(query_vector, candidates, store)
+    if vectors is None:
+        # Keep rank order
+        return candidates[:k]
+    selected = [int(np.argmax(relevance))]
+    while len(selected) < min(k, len(candidates)):
+        redundancy = (vectors @ vectors[selected].T).max(axis=1)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return [candidates[i] for i in selected]
+
+
+def _dense_search(query: str, k: int, store, allowed_positions, mmr: bool, min_similarity: float = None) -> list:
+    """
+    Article IDs for the query from the FAISS index, best first.
+
+    Over-fetches chunks and keeps the best chunk per article, widening the
+    fetch only when hits still collapse to fewer than k articles. With
+    `min_similarity`, articles whose best chunk is less similar to the query
+    are dropped.
+    """
+    ctx = current_request_context()
+    with ctx.timed("embedding", cache="hit" if embeddings.cached(query) else "miss"):
+        query_vector = np.asarray([embeddings.embed_query(query)], dtype=np.float32)
+    if getattr(store, "_normalize_L2", False):
+        faiss.normalize_L2(query_vector)
+
+    params = None
+    if allowed_positions is not None:
+        params = search_params(store.index, faiss.IDSelectorBatch(np.asarray(allowed_positions, dtype=np.int64)))
+
+    limit = store.index.ntotal if allowed_positions is None else len(allowed_positions)
+    fetch_k = min(k * SEARCH_OVERFETCH, limit)
+    while True:
+        with ctx.timed("faiss_search"):
+            _, positions = store.index.search(query_vector, fetch_k, params=params)
+
+        best = {}
+        for position in positions[0]:
+            if position < 0:
+                continue
+            doc_id = store.index_to_docstore_id.get(int(position))
+            if doc_id is None:
+                continue
+            doc = store.docstore.search(doc_id)
+            # Skip entries without an article_id (chat turns older memories wrote into the index)
+            article_id = getattr(doc, "metadata", {}).get("article_id")
+            if article_id is not None and str(article_id) not in best:
+                best[str(article_id)] = (len(best), int(position))
+        if len(best) >= k or fetch_k >= limit:
+            break
+        fetch_k = min(fetch_k * 2, limit)
+
+    candidates = list(best.items())
+    if min_similarity is not None and candidates:
+        _, relevance = _candidate_relevance(query_vector, candidates, store)
+        if relevance is not None:
+            candidates = [c for c, score in zip(candidates, relevance) if score >= min_similarity]
+    if mmr and len(candidates) > k:
+        candidates = _mmr(query_vector, candidates, store, k, SEARCH_MMR_LAMBDA)
+    return [article_id for article_id, _ in candidates]
+
+
+def search_article_ids(query: str, k: int = 5, category: str = None, date_from: str = None,
+                       date_to: str = None, mmr: bool = False, hybrid: bool = SEARCH_HYBRID,
+                       min_similarity: float = None) -> list:
+    """
+    Return up to k distinct article IDs for the query, best first.
+
+    Category/date filters are applied inside the search through the sidecar
+    metadata index, and MMR can diversify the dense results. With `hybrid`,
+    dense results are fused with BM25 results by reciprocal rank, and short
+    exact-name queries are answered from the lexical index alone, skipping
+    the embedding model. With `min_similarity`, a query none of whose dense
+    hits reaches that cosine similarity finds nothing, whatever BM25 matched.
+    """
+    ctx = current_request_context()
+    refresh_vector_store()
+    store = get_vector_store()
+    metadata = get_article_metadata()
+
+    allowed_articles = metadata.allowed_articles(store, category, date_from, date_to)
+    if allowed_articles is not None and not allowed_articles:
+        return []
+
+    lexical_ids = []
+    if hybrid:
+        lexical = get_lexical_index()
+        with ctx.timed("lexical_search"):
+            if is_name_query(query):
+                lexical_ids = [a for a, _ in lexical.search(query, k * SEARCH_OVERFETCH, required_terms=name_terms(query))
+                               if allowed_articles is None or a in allowed_articles]
+                if lexical_ids:
+                    logger.info("🔎 Name query answered from the lexical index: %s", lexical_ids[:k])
+                    return lexical_ids[:k]
+            lexical_ids = [a for a, _ in lexical.search(query, k * SEARCH_OVERFETCH)
+                           if allowed_articles is None or a in allowed_articles]
+
+    allowed_positions = metadata.allowed_positions(store, category, date_from, date_to)
+    dense_ids = _dense_search(query, k, store, allowed_positions, mmr, min_similarity)
+    if min_similarity is not None and not dense_ids:
+        logger.info("🔎 No article reaches similarity %.2f for %r", min_similarity, query)
+        return []
+    article_ids = reciprocal_rank_fusion([dense_ids, lexical_ids])[:k] if lexical_ids else dense_ids[:k]
+    logger.debug("Article IDs for %r: %s", query, article_ids)
+    return article_ids
+
+
+def _find_summaries(article_ids: list, timeout: float = None) -> dict:
+    """
+    Blocking batch lookup of summaries on the pooled Mongo client, keyed by
+    article ID string. `timeout` bounds the query server-side, in seconds.
+    """
+    query_ids = []
+    for a in article_ids:
+        query_ids.append(int(a) if a.isdigit() else a)
+
+    articles_cursor = mongo_connection.summaries().find(
+        {"article_id": {"$in": query_ids}},
+        {"article_id": 1, "summary.summary": 1, "_id": 0}
+    )
+    if timeout:
+        articles_cursor = articles_cursor.max_time_ms(max(int(timeout * 1000), 1))
+
+    found = {}
+    for doc in articles_cursor:
+        try:
+            found[str(doc["article_id"])] = doc["summary"]["summary"]
+        except (KeyError, TypeError):
+            continue
+    return found
+
+
+async def fetch_summaries(article_ids: list) -> list:
+    """
+    Fetch the summaries for the given article IDs, in the order the IDs were
+    requested. Cached summaries are served in-process; only the missing IDs
+    are fetched from the `summaries` collection, in one batch.
+
+    Returns:
+        list: Summary strings for the articles that were found.
+    """
+    ctx = current_request_context()
+    ids = list(dict.fromkeys(str(a).strip() for a in article_ids))
+    with ctx.timed("summary_cache") as span:
+        found = summary_cache.get_many(ids)
+        missing = [a for a in ids if a not in found]
+        span.set(cache="miss" if missing else "hit", hits=len(found), misses=len(missing))
+    if missing:
+        with ctx.timed("mongo_fetch"):
+            fetched = await with_deadline(asyncio.to_thread(_find_summaries, missing, time_left()), "mongo_fetch")
+        summary_cache.put_many(fetched)
+        found.update(fetched)
+
+    summaries = [found[a] for a in ids if a in found]
+    ctx.add_summaries(summaries)
+    ctx.add_article_ids(a for a in ids if a in found)
+    return summaries
+
+
 @function_tool
-def mongo_tool(query: str=None):
+async def mongo_tool(query: str=None, category: str=None, date_from: str=None, date_to: str=None):
     """
     Fetch article IDs from MongoDB based on content similarity to the query.
      Args:
         query (str): The content-based query to search for relevant articles.
+        category (str): Optional category (lower case) the articles must belong to.
+        date_from (str): Optional earliest publication date, YYYY-MM-DD.
+        date_to (str): Optional latest publication date, YYYY-MM-DD.
     Returns:
         List of article_ids that are relevant to the query. 
     The article_id should be in string format and correspond to articles in the Neo4j knowledge graph.
@@ -31,13 +327,15 @@ def mongo_tool(query: str=None):
         """
     
     
-    results = vector_store.similarity_search(query, k=5) 
-    article_map = {str(insight.metadata["article_id"]): insight for insight in results}
-    print(list(article_map.keys()))
-    return list(article_map.keys())
+    # Embedding and FAISS search are CPU-bound; keep them off the event loop
+    article_ids = await asyncio.to_thread(
+        search_article_ids, query, k=5, category=category, date_from=date_from, date_to=date_to,
+    )
+    account("tool_outputs", str(article_ids))
+    return article_ids
 
 @function_tool
-def summary_tool(article_ids: list)-> list:
+async def summary_tool(article_ids: list)-> list:
     """
     Fetch article summaries from MongoDB based on a list of article IDs.
     
@@ -52,36 +350,15 @@ def summary_tool(article_ids: list)-> list:
         returns "Summary of article 1...\nSummary of article 2..."
     """
 
-    db = mongo_connection.mongo_client["news_db"]
-    collection = db["summaries"]
-
     if not article_ids or not isinstance(article_ids, list):
         raise ValueError("article_ids must be a non-empty list of article ID strings or integers.")
 
-    converted_ids = []
-    for a in article_ids:
-        try:
-            converted_ids.append(int(a))
-        except ValueError:
-            converted_ids.append(a)  
-
-    articles_cursor = collection.find(
-        {"article_id": {"$in": converted_ids}},
-        {"summary.summary": 1, "_id": 0}
-    )
-
-    summaries = []
-    for doc in articles_cursor:
-        try:
-            summaries.append(doc["summary"]["summary"])
-        except (KeyError, TypeError):
-            continue
+    summaries = await fetch_summaries(article_ids)
 
     if not summaries:
-        print("⚠️ No summaries found for the provided article IDs.")
+        logger.warning("⚠️ No summaries found for the provided article IDs.")
         return []
-    combined_text = "\n".join(summaries)
-    with open("summary.json", "w") as f:
-        json.dump(summaries, f, indent=4)
-    print("Retrieved summaries----------\n",combined_text)
+    # The most query-relevant summaries that fit the prompt's tool output budget
+    combined_text = "\n".join(fit_tool_output(summaries))
+    logger.debug("Retrieved summaries----------\n%s", combined_text)
     return combined_text
@@ -1,18 +1,106 @@
+import asyncio
+import logging
 from agents import (
     Agent, Runner,
     OpenAIChatCompletionsModel,
     function_tool, FunctionTool
 )
 from langchain_core.tools import tool
-from constants.llms.models import chain 
+from langchain_neo4j.chains.graph_qa.cypher import extract_cypher
+from constants.llms.models import get_chain
 from constants.connection.neo4j_connection import connection
 from constants.prompts import Prompts
+from services.cypher_templates import TEMPLATES, match_template
+from services.cypher_cache import cypher_cache
+from services.llm_limits import llm_slot
+from services.request_context import current_request_context
+from services.deadline import DeadlineExceeded, time_left, with_deadline
+from services.token_budget import fit_rows
+
+logger = logging.getLogger(__name__)
+
+
+async def _read(cypher: str, params: dict = None) -> list:
+    """Run a read query bounded by the request's deadline, server-side and client-side."""
+    return await with_deadline(connection.read_async(cypher, params, timeout=time_left()), "neo4j_execution")
+
+
+async def fetch_articles_by_ids(article_ids: list) -> list:
+    """
+    Fetch title, link, author and category for the given article IDs with a
+    single parameterized query, without any Cypher generation.
+    """
+    ctx = current_request_context()
+    with ctx.timed("neo4j_execution"):
+        rows = await _read(TEMPLATES["articles_by_ids"], {"ids": [str(a) for a in article_ids]})
+    ctx.add_rows(rows)
+    return rows
+
+
+async def generate_cypher(question: str) -> str:
+    """
+    Generate Cypher with the chain's generation step only.
+
+    Unlike `chain.invoke`, this neither executes the query against the graph
+    nor makes the second QA LLM call over its results.
+    """
+    # The first call builds the chain, which introspects the graph schema
+    chain = await asyncio.to_thread(get_chain)
+    async with llm_slot("groq"):
+        generated = await with_deadline(
+            chain.cypher_generation_chain.ainvoke({"question": question, "schema": chain.graph_schema}),
+            "cypher_generation",
+        )
+    return extract_cypher(generated)
+
 
 @function_tool
-def neo4j_tool(query: str=None):
+async def neo4j_tool(query: str=None, article_ids: list[str]=None, author: str=None, category: str=None):
     """
-    Generate and execute a Cypher query against the Neo4j database.
+    Fetch structured article data (title, refLink, author, category) from the Neo4j database.
+
+    Common shapes are answered from precompiled query templates; any other
+    question is turned into a Cypher query by an LLM.
+
+    Args:
+        query (str): The user question in natural language.
+        article_ids (list[str]): Article IDs to fetch, e.g. from mongo_tool.
+        author (str): Full author name to filter on, matched exactly (case-insensitive).
+        category (str): Category to filter on (lower case).
     """
+    ctx = current_request_context()
+    template = match_template(query, article_ids, author, category)
+    if template:
+        name, cypher, params = template
+        with ctx.timed("neo4j_execution", cypher=f"template:{name}") as span:
+            rows = await _read(cypher, params)
+            span.set(rows=len(rows))
+        explicit = bool(article_ids or author or category)
+        if rows or explicit:
+            logger.info("Neo4j template '%s' returned %d rows", name, len(rows))
+            ctx.add_rows(rows)
+            return fit_rows(rows)
+
+    with ctx.timed("cypher_cache") as span:
+        cached_cypher = cypher_cache.get(query)
+        span.set(cache="hit" if cached_cypher else "miss")
+    if cached_cypher:
+        try:
+            with ctx.timed("neo4j_execution", cypher="cached") as span:
+                ans = await _read(cached_cypher)
+                span.set(rows=len(ans))
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # A stale query (e.g. after a schema change) would fail on every
+            # repeat of the question: drop it and generate a new one
+            logger.warning("⚠️ Cached Cypher failed, regenerating: %s", e)
+            cypher_cache.invalidate(query)
+        else:
+            logger.info("Cypher cache hit: %s", cypher_cache.stats())
+            ctx.add_rows(ans)
+            return fit_rows(ans)
+
     prompts = Prompts(query)
     restricted_query = f"""
 You are a Cypher query generator for Neo4j.
@@ -29,8 +117,6 @@ Schema pattern to always follow:
 
 Follow the schema pattern strictly. Check the nodes, labels, properties, and relationships before generating the Cypher query.
 
-After generating the Cypher query, make sure to run the query in the Neo4j database. Always return the result of the query.
-
 The labels are:
 Author, Articles, Category
 
@@ -44,11 +130,12 @@ MATCH (a:Author)-[:WROTE]->(b:Articles)-[:BELONGSTO]->(c:Category)
     RETURN b.title AS title, b.refLink AS refLink, a.author AS author, c.category AS category
 """
 
-    result = chain.invoke(restricted_query)
-        
-    required = connection.session.run(result["result"])
-    ans = []
-    for r in required:
-        ans.append(r)
-    print(ans)
-    return ans
\ No newline at end of file
+    with ctx.timed("cypher_generation"):
+        cypher = await generate_cypher(restricted_query)
+    with ctx.timed("neo4j_execution", cypher="generated") as span:
+        ans = await _read(cypher)
+        span.set(rows=len(ans))
+    cypher_cache.put(query, cypher)
+    ctx.add_rows(ans)
+    logger.debug("Neo4j rows: %s", ans)
+    return fit_rows(ans)
\ No newline at end of file
@@ -1,36 +1,77 @@
+import logging
+import os
+import re
 from constants.llms import models
-import json
+from services.lexical_index import STOPWORDS, tokenize
+from services.llm_limits import llm_slot
+from services.token_budget import account, fit_texts
+from services.request_context import current_request_context
+from services.deadline import REFINE_MIN_SECONDS, DeadlineExceeded, has_time_for, iterate_with_deadline
 
-def refine_response_with_gemini(user_query: str, full_response: str) -> str:
+logger = logging.getLogger(__name__)
+
+# Summary tokens the refinement prompt may carry
+REFINE_SUMMARY_TOKENS = int(os.getenv("REFINE_SUMMARY_TOKENS", "3000"))
+# Share of answer sentences that must be backed by the summaries to skip refinement
+REFINE_GROUNDING_THRESHOLD = float(os.getenv("REFINE_GROUNDING_THRESHOLD", "0.85"))
+
+IDENTITY_KEYWORDS = [
+    "hi","how are you","who are you", "what are you", "your name", "which model", "what model",
+    "are you real", "are you human", "what version", "who made you",
+    "identity"
+]
+
+
+def summary_text(summary) -> str:
+    return summary["summary"] if isinstance(summary, dict) and "summary" in summary else str(summary)
+
+
+def _content_terms(text: str) -> set:
+    return {t for t in tokenize(text) if t not in STOPWORDS and len(t) > 2}
+
+
+def trim_summaries(summaries: list, budget: int, query: str = "", answer: str = "") -> list:
+    """Keep the summaries most related to the query and answer within `budget` tokens."""
+    return fit_texts([summary_text(s) for s in summaries], budget, query + " " + answer)
+
+
+def grounding_score(answer: str, summaries: list) -> float:
     """
-    Validates and refines the main agent's response using trusted summaries.
-    Ensures:
-      - Factual alignment with provided summaries only.
-      - Logical correlation between user question and answer.
-      - No hallucination or speculative rewriting.
-      - Keeps only relevant reference links (and preserves valid ones).
-      - Graceful fallback if summaries lack relevant info.
+    Share of the answer's sentences whose content words nearly all appear in
+    the summaries; 1.0 means every claim can be traced back to them.
     """
-
-    # Load summaries safely
-    with open("summary.json", "r") as f:
-        summaries = json.load(f)
-
-    # Convert summaries to readable text (in case they're dicts)
-    summaries_response = "\n\n".join(
-        s["summary"] if isinstance(s, dict) and "summary" in s else str(s)
-        for s in summaries
-    )
-
-    identity_keywords = [
-        "hi","how are you","who are you", "what are you", "your name", "which model", "what model",
-        "are you real", "are you human", "what version", "who made you",
-        "identity"
-    ]
-    if any(keyword in user_query.lower() for keyword in identity_keywords):
-        return full_response
-
-    prompt = f"""
+    source = set()
+    for s in summaries:
+        source |= _content_terms(summary_text(s))
+    sentences = [_content_terms(s) for s in re.split(r"(?<=[.!?])\s+|\n+", answer)]
+    sentences = [terms for terms in sentences if len(terms) >= 3]
+    if not sentences or not source:
+        return 0.0
+    grounded = sum(1 for terms in sentences if len(terms & source) / len(terms) >= 0.8)
+    return grounded / len(sentences)
+
+
+def needs_refinement(user_query: str, full_response: str, summaries: list) -> bool:
+    """
+    Skip identity/small-talk queries, answers with no summaries to check
+    them against (Neo4j-only answers) and answers already grounded in the
+    summaries.
+    """
+    if any(keyword in user_query.lower() for keyword in IDENTITY_KEYWORDS):
+        return False
+    if not summaries:
+        # Refining against nothing would replace the answer with the fallback
+        logger.info("⏭️ Skipping refinement, no summaries to ground the answer")
+        return False
+    score = grounding_score(full_response, summaries)
+    if score >= REFINE_GROUNDING_THRESHOLD:
+        logger.info("⏭️ Skipping refinement, answer grounding %.2f", score)
+        return False
+    return True
+
+
+def refinement_prompt(user_query: str, full_response: str, summaries_response: str) -> str:
+    return f"""
 You are a **Strict and Intelligent Response Validation Agent**.
 
 Your responsibility is to **verify, validate, refine, and reformat** the assistant's response
@@ -99,11 +140,68 @@ using only the trusted factual summaries provided below.
 """
 
 
-    try:
-        response = models.groq_llm.invoke(prompt)
-        refined_text = getattr(response, "content", str(response)).strip()
-        return refined_text or full_response
+def refinement_fell_back() -> bool:
+    """Whether this request's refinement was cut short and the draft answer should stand."""
+    degradations = current_request_context().degradations
+    return "refinement_timeout" in degradations or "refinement_failed" in degradations
+
+
+async def stream_refinement(user_query: str, full_response: str, summaries: list = None):
+    """
+    Validates and refines the main agent's response using trusted summaries,
+    yielding the refined answer as it streams.
+    Ensures:
+      - Factual alignment with provided summaries only.
+      - Logical correlation between user question and answer.
+      - No hallucination or speculative rewriting.
+      - Keeps only relevant reference links (and preserves valid ones).
+      - Graceful fallback if summaries lack relevant info.
+
+    Yields the original response unchanged when refinement is skipped (also
+    when the deadline leaves too little time) or fails before producing any
+    text. A refinement cut short by the deadline or an error records
+    "refinement_timeout" or "refinement_failed", and callers show the draft
+    instead (see `refinement_fell_back`).
+    """
+
+    # Summaries retrieved by the tools while serving this request
+    if summaries is None:
+        summaries = current_request_context().summaries
 
+    if not needs_refinement(user_query, full_response, summaries):
+        yield full_response
+        return
+    if not has_time_for(REFINE_MIN_SECONDS):
+        current_request_context().degrade("refinement_skipped")
+        yield full_response
+        return
+
+    summaries_response = "\n\n".join(trim_summaries(summaries, REFINE_SUMMARY_TOKENS, user_query, full_response))
+    prompt = refinement_prompt(user_query, full_response, summaries_response)
+    prompt_tokens = account("refinement", prompt)
+
+    produced = False
+    try:
+        with current_request_context().timed("refinement", prompt_tokens=prompt_tokens):
+            async with llm_slot("groq"):
+                async for chunk in iterate_with_deadline(models.groq_llm.astream(prompt), "refinement"):
+                    token = getattr(chunk, "content", "") or ""
+                    if token:
+                        produced = True
+                        yield token
+    except DeadlineExceeded:
+        # Callers check this degradation to fall back to the draft answer
+        current_request_context().degrade("refinement_timeout")
+        if not produced:
+            yield full_response
+        return
     except Exception as e:
-        print("⚠️ Refinement error:", e)
-        return full_response
+        logger.warning("⚠️ Refinement error: %s", e)
+        # A partial refinement must not become the answer
+        current_request_context().degrade("refinement_failed")
+        if not produced:
+            yield full_response
+        return
+    if not produced:
+        yield full_response
+
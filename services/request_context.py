@@ -0,0 +1,155 @@
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """One timed stage of a request. attrs carry token counts, cache hit/miss and the like."""
+    name: str
+    # Seconds since the request started
+    start: float
+    seconds: float = 0.0
+    attrs: dict = field(default_factory=dict)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+@dataclass
+class RequestContext:
+    """
+    Per-request state shared between the tools, the pipeline and the refiner.
+
+    Lives in a ContextVar, so every asyncio task and worker thread spawned
+    while serving one request sees the same object and concurrent requests
+    never see each other's data.
+    """
+    query: str = ""
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    summaries: list = field(default_factory=list)
+    neo4j_rows: list = field(default_factory=list)
+    timings: dict = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+    # Absolute perf_counter time the answer is due by; None means no budget
+    deadline: float = None
+    degradations: list = field(default_factory=list)
+    # Articles the answer was built from, and whether it came from the answer cache
+    article_ids: list = field(default_factory=list)
+    cached: bool = False
+    # Prompt/usage tokens by category, see services.token_budget
+    tokens: dict = field(default_factory=dict)
+    # Finished stages, see services.tracing
+    spans: list = field(default_factory=list)
+    finished: float = None
+
+    def add_summaries(self, summaries: list):
+        for summary in summaries:
+            if summary not in self.summaries:
+                self.summaries.append(summary)
+
+    def add_article_ids(self, article_ids: list):
+        for article_id in article_ids:
+            if article_id is not None and str(article_id) not in self.article_ids:
+                self.article_ids.append(str(article_id))
+
+    def add_rows(self, rows: list):
+        """Keep Neo4j rows and the article IDs they carry."""
+        self.neo4j_rows.extend(rows)
+        self.add_article_ids(row.get("article_id") for row in rows if isinstance(row, dict))
+
+    def add_tokens(self, category: str, tokens: int):
+        self.tokens[category] = self.tokens.get(category, 0) + tokens
+
+    def record_timing(self, stage: str, seconds: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (inf without one, never negative)."""
+        if self.deadline is None:
+            return float("inf")
+        return max(self.deadline - time.perf_counter(), 0.0)
+
+    def degrade(self, reason: str):
+        """Record that part of the answer was skipped or cut to meet the deadline."""
+        if reason not in self.degradations:
+            logger.warning("⏳ Degraded: %s (%.1fs left)", reason, self.remaining())
+            self.degradations.append(reason)
+
+    def mark(self, stage: str):
+        """Record the time from request start to now, once per stage (e.g. first_token)."""
+        self.timings.setdefault(stage, time.perf_counter() - self.started)
+
+    def add_span(self, stage: str, start: float, seconds: float, **attrs) -> Span:
+        """Record a finished stage that started at perf_counter time `start`."""
+        span = Span(stage, start - self.started, seconds, attrs)
+        self.spans.append(span)
+        self.record_timing(stage, seconds)
+        return span
+
+    @contextmanager
+    def timed(self, stage: str, **attrs):
+        """Time a stage as a span; the yielded span takes extra attributes via `span.set`."""
+        start = time.perf_counter()
+        span = Span(stage, start - self.started, attrs=attrs)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.seconds = time.perf_counter() - start
+            self.spans.append(span)
+            self.record_timing(stage, span.seconds)
+
+
+# End-to-end budget of one user request; 0 disables the deadline
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+
+_current_request = ContextVar("request_context", default=None)
+_end_callbacks = []
+
+
+def on_request_end(callback):
+    """Register `callback(ctx)`, called when a request scope exits; usable as a decorator."""
+    _end_callbacks.append(callback)
+    return callback
+
+
+def current_request_id() -> str:
+    """ID of the active request, "-" outside a request scope."""
+    ctx = _current_request.get()
+    return ctx.request_id if ctx else "-"
+
+
+def current_request_context() -> RequestContext:
+    """
+    Return the active request's context. Outside a request scope a throwaway
+    context is returned so callers never need to check for None.
+    """
+    return _current_request.get() or RequestContext()
+
+
+@contextmanager
+def request_scope(query: str = "", budget_seconds: float = REQUEST_DEADLINE_SECONDS):
+    """Bind a fresh RequestContext for one user request, due `budget_seconds` from now."""
+    ctx = RequestContext(query=query)
+    if budget_seconds:
+        ctx.deadline = ctx.started + budget_seconds
+    token = _current_request.set(ctx)
+    try:
+        yield ctx
+    finally:
+        ctx.finished = time.perf_counter()
+        for callback in _end_callbacks:
+            try:
+                callback(ctx)
+            except Exception as e:
+                logger.warning("⚠️ Request end hook %s failed: %s", getattr(callback, "__qualname__", callback), e)
+        _current_request.reset(token)
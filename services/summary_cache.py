@@ -0,0 +1,80 @@
+import os
+import threading
+from collections import OrderedDict
+from services.invalidation import on_articles_changed
+from dotenv import load_dotenv
+load_dotenv()
+
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "10000"))
+
+
+class SummaryCache:
+    """
+    In-process LRU cache of article_id → summary, bounded by total UTF-8 size
+    and entry count. Keys are article IDs as strings.
+    """
+
+    def __init__(self, max_bytes: int = SUMMARY_CACHE_MAX_BYTES, max_entries: int = SUMMARY_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, article_ids: list) -> dict:
+        """Return the cached summaries among `article_ids`, counting a hit or miss per id."""
+        found = {}
+        with self._lock:
+            for article_id in article_ids:
+                entry = self._entries.get(article_id)
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(article_id)
+                self.hits += 1
+                found[article_id] = entry[0]
+        return found
+
+    def put_many(self, summaries: dict):
+        with self._lock:
+            for article_id, summary in summaries.items():
+                size = len(summary.encode("utf-8"))
+                if size > self.max_bytes:
+                    continue
+                self._discard(article_id)
+                self._entries[article_id] = (summary, size)
+                self.size_bytes += size
+            while self._entries and (self.size_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, (_, size) = self._entries.popitem(last=False)
+                self.size_bytes -= size
+                self.evictions += 1
+
+    def invalidate(self, article_ids: list):
+        with self._lock:
+            for article_id in article_ids:
+                self._discard(str(article_id))
+
+    def _discard(self, article_id):
+        entry = self._entries.pop(article_id, None)
+        if entry is not None:
+            self.size_bytes -= entry[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+summary_cache = SummaryCache()
+on_articles_changed(summary_cache.invalidate)
@@ -0,0 +1,172 @@
+"""
+Token accounting and prompt budgets.
+
+Every request records the tokens it puts into prompts by category
+(instructions, history, tool_outputs, refinement, answer) and the tokens
+the agent's model calls actually consumed (llm_input, llm_output) on its
+RequestContext. `token_metrics` aggregates them across requests.
+
+History and tool outputs are fitted under PROMPT_TOKEN_BUDGET, after the
+agent instructions: the most query-relevant parts are kept in their
+original order and the last one kept is cut at a sentence boundary.
+"""
+import os
+import threading
+from constants.prompts import Prompts
+from services.lexical_index import STOPWORDS, tokenize
+from services.request_context import current_request_context, on_request_end
+from dotenv import load_dotenv
+load_dotenv()
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _encoding = None
+
+# Ceiling for instructions + history + tool outputs of one agent prompt
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "8000"))
+# Share of the room left after the instructions that history may take
+HISTORY_BUDGET_SHARE = float(os.getenv("HISTORY_BUDGET_SHARE", "0.25"))
+# Every tool output keeps at least this many tokens, even past the budget
+MIN_TOOL_OUTPUT_TOKENS = int(os.getenv("MIN_TOOL_OUTPUT_TOKENS", "256"))
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, else ~4 characters per token."""
+    text = text or ""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def account(category: str, text: str) -> int:
+    """Count `text` towards the current request's `category` and return its tokens."""
+    tokens = count_tokens(text)
+    current_request_context().add_tokens(category, tokens)
+    return tokens
+
+
+def truncate_text(text: str, budget: int) -> str:
+    """Cut `text` to at most `budget` tokens, at a sentence boundary when there is one."""
+    if count_tokens(text) <= budget:
+        return text
+    cut = text[:max(budget, 0) * 4]
+    while cut and count_tokens(cut) > budget:
+        cut = cut[:int(len(cut) * 0.9)]
+    boundary = cut.rfind(". ")
+    return cut[:boundary + 1] if boundary > 0 else cut
+
+
+def _terms(text: str) -> set:
+    return {t for t in tokenize(text) if t not in STOPWORDS and len(t) > 2}
+
+
+def fit_texts(texts: list, budget: int, query: str = "") -> list:
+    """
+    Keep the texts most related to `query` within `budget` tokens, in their
+    original order. Ties keep earlier texts first; the last text kept is
+    truncated when it does not fit whole.
+    """
+    wanted = _terms(query)
+    ranked = sorted(range(len(texts)), key=lambda i: -len(wanted & _terms(texts[i])))
+    kept, used = {}, 0
+    for i in ranked:
+        cost = count_tokens(texts[i])
+        if used + cost <= budget:
+            kept[i] = texts[i]
+            used += cost
+            continue
+        cut = truncate_text(texts[i], budget - used)
+        if cut:
+            kept[i] = cut
+        break
+    return [kept[i] for i in sorted(kept)]
+
+
+def instruction_tokens() -> int:
+    return count_tokens(Prompts.instructions)
+
+
+def history_budget() -> int:
+    return int(max(PROMPT_TOKEN_BUDGET - instruction_tokens(), 0) * HISTORY_BUDGET_SHARE)
+
+
+def tool_output_budget() -> int:
+    """Tokens tool outputs may still add to the current request's prompts."""
+    room = PROMPT_TOKEN_BUDGET - instruction_tokens() - history_budget()
+    used = current_request_context().tokens.get("tool_outputs", 0)
+    return max(room - used, MIN_TOOL_OUTPUT_TOKENS)
+
+
+def fit_tool_output(texts: list, query: str = None) -> list:
+    """Fit one tool's output pieces into the remaining tool budget and account for them."""
+    ctx = current_request_context()
+    kept = fit_texts(texts, tool_output_budget(), ctx.query if query is None else query)
+    account("tool_outputs", "\n".join(kept))
+    return kept
+
+
+def fit_rows(rows: list) -> list:
+    """
+    Keep the leading result rows that fit the remaining tool budget (at least
+    one) and account for them. When rows are dropped, a last entry says how
+    many, so the agent does not count or list a partial set as complete.
+    """
+    budget = tool_output_budget()
+    kept, used = [], 0
+    for row in rows:
+        cost = count_tokens(str(row))
+        if kept and used + cost > budget:
+            break
+        kept.append(row)
+        used += cost
+    if len(kept) < len(rows):
+        marker = f"({len(rows) - len(kept)} more rows omitted; {len(rows)} rows in total)"
+        kept.append(marker)
+        used += count_tokens(marker)
+    current_request_context().add_tokens("tool_outputs", used)
+    return kept
+
+
+def record_usage(response):
+    """Account the agent run's instructions and the model calls' reported usage."""
+    if response is None:
+        return
+    ctx = current_request_context()
+    raw_responses = getattr(response, "raw_responses", None) or []
+    # The instructions go out with every model call of the tool loop
+    ctx.add_tokens("instructions", instruction_tokens() * len(raw_responses))
+    for raw in raw_responses:
+        usage = getattr(raw, "usage", None)
+        ctx.add_tokens("llm_input", getattr(usage, "input_tokens", 0) or 0)
+        ctx.add_tokens("llm_output", getattr(usage, "output_tokens", 0) or 0)
+
+
+class TokenMetrics:
+    """Running token totals per category across requests."""
+
+    def __init__(self):
+        self.requests = 0
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, ctx):
+        if not ctx.tokens:
+            return
+        with self._lock:
+            self.requests += 1
+            for category, tokens in ctx.tokens.items():
+                self.totals[category] = self.totals.get(category, 0) + tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "totals": dict(self.totals),
+                "per_request": {c: round(t / self.requests, 1) for c, t in self.totals.items()} if self.requests else {},
+            }
+
+
+token_metrics = TokenMetrics()
+on_request_end(token_metrics.record)
@@ -0,0 +1,232 @@
+"""
+Stage-level tracing for the request path.
+
+Every `RequestContext.timed(stage)` block is a span: embedding,
+faiss_search, lexical_search, mongo_fetch, cypher_generation,
+neo4j_execution, synthesis, refinement and the answer/summary caches.
+Agent LLM turns and tool calls are added by `TracingRunHooks`. Spans carry
+latency plus attributes such as token counts and cache hit/miss.
+
+When a request ends its per-stage breakdown is logged under its request ID
+and its spans feed per-stage latency histograms. `collector.flush()`
+exports the histograms and the recent request breakdowns as JSON, either
+POSTed to TRACE_COLLECTOR_URL or appended to TRACE_EXPORT_PATH. A
+background thread flushes every TRACE_FLUSH_SECONDS.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from agents import RunHooks
+from services.request_context import current_request_context, current_request_id, on_request_end
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "")
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+# 0 disables the background export
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "60"))
+# Request breakdowns kept for the next export
+TRACE_MAX_REQUESTS = int(os.getenv("TRACE_MAX_REQUESTS", "1000"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Upper bounds of the latency buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with approximate percentiles."""
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (inf past the last bound)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total, 3),
+            "buckets_ms": dict(zip([*map(str, self.bounds), "+Inf"], self.counts)),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+        }
+
+
+class TraceCollector:
+    """
+    Aggregates finished requests: a latency histogram, cache hit/miss counts
+    and token sums per stage, plus the recent per-request breakdowns.
+    """
+
+    def __init__(self, max_requests: int = TRACE_MAX_REQUESTS):
+        self.max_requests = max_requests
+        self.stages = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def _stage(self, name: str) -> dict:
+        if name not in self.stages:
+            self.stages[name] = {"latency": Histogram(), "cache_hits": 0, "cache_misses": 0, "tokens": {}}
+        return self.stages[name]
+
+    def record_request(self, ctx):
+        total_ms = ((ctx.finished or time.perf_counter()) - ctx.started) * 1000
+        record = {
+            "request_id": ctx.request_id,
+            "total_ms": round(total_ms, 3),
+            "spans": [
+                {"stage": s.name, "start_ms": round(s.start * 1000, 3), "ms": round(s.seconds * 1000, 3), **s.attrs}
+                for s in ctx.spans
+            ],
+            "tokens": dict(ctx.tokens),
+            "degradations": list(ctx.degradations),
+        }
+        with self._lock:
+            self._stage("request")["latency"].observe(total_ms)
+            for span in ctx.spans:
+                stage = self._stage(span.name)
+                stage["latency"].observe(span.seconds * 1000)
+                cache = span.attrs.get("cache")
+                if cache == "hit":
+                    stage["cache_hits"] += 1
+                elif cache == "miss":
+                    stage["cache_misses"] += 1
+                for key, value in span.attrs.items():
+                    if key.endswith("tokens") and isinstance(value, (int, float)):
+                        stage["tokens"][key] = stage["tokens"].get(key, 0) + value
+            self.requests.append(record)
+            del self.requests[:-self.max_requests]
+        self._ensure_flusher()
+        logger.info("⏱️ %s", format_breakdown(ctx))
+
+    def export(self) -> dict:
+        """Histograms and counters per stage."""
+        with self._lock:
+            return {
+                name: {**stage["latency"].to_dict(), "cache_hits": stage["cache_hits"],
+                       "cache_misses": stage["cache_misses"], "tokens": dict(stage["tokens"])}
+                for name, stage in self.stages.items()
+            }
+
+    def flush(self):
+        """Send the histograms and the request breakdowns gathered since the last flush."""
+        histograms = self.export()
+        with self._lock:
+            requests, self.requests = self.requests, []
+        if not histograms:
+            return
+        payload = {"time": time.time(), "histograms": histograms, "requests": requests}
+        try:
+            if TRACE_COLLECTOR_URL:
+                request = urllib.request.Request(
+                    TRACE_COLLECTOR_URL, data=json.dumps(payload).encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+            elif TRACE_EXPORT_PATH:
+                with open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload) + "\n")
+        except Exception as e:
+            logger.warning("⚠️ Trace export failed: %s", e)
+
+    def _ensure_flusher(self):
+        if TRACE_FLUSH_SECONDS <= 0 or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="trace-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(TRACE_FLUSH_SECONDS)
+            self.flush()
+
+
+def format_breakdown(ctx) -> str:
+    """One-line per-stage timing breakdown of a request, in span order."""
+    total = ((ctx.finished or time.perf_counter()) - ctx.started) * 1000
+    parts = [f"request {ctx.request_id} {total:.0f}ms"]
+    for span in ctx.spans:
+        extra = ", ".join(f"{k}={v}" for k, v in span.attrs.items())
+        parts.append(f"{span.name} {span.seconds * 1000:.0f}ms" + (f" ({extra})" if extra else ""))
+    if ctx.degradations:
+        parts.append(f"degraded: {', '.join(ctx.degradations)}")
+    return " | ".join(parts)
+
+
+collector = TraceCollector()
+on_request_end(collector.record_request)
+
+
+class TracingRunHooks(RunHooks):
+    """Agent run hooks adding a span per LLM turn and per tool call."""
+
+    def __init__(self):
+        self._llm_started = None
+        self._tools_started = {}
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        self._llm_started = time.perf_counter()
+
+    async def on_llm_end(self, context, agent, response):
+        if self._llm_started is None:
+            return
+        usage = getattr(response, "usage", None)
+        current_request_context().add_span(
+            "agent_llm", self._llm_started, time.perf_counter() - self._llm_started,
+            agent=agent.name,
+            input_tokens=getattr(usage, "input_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0,
+        )
+        self._llm_started = None
+
+    async def on_tool_start(self, context, agent, tool):
+        self._tools_started[tool.name] = time.perf_counter()
+
+    async def on_tool_end(self, context, agent, tool, result):
+        started = self._tools_started.pop(tool.name, None)
+        if started is not None:
+            current_request_context().add_span(f"tool:{tool.name}", started, time.perf_counter() - started)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the active request's ID to log records, so lines of concurrent requests can be told apart."""
+
+    def filter(self, record):
+        record.request_id = current_request_id()
+        return True
+
+
+def configure_logging(level: str = LOG_LEVEL):
+    """Log with timestamps and request IDs; replaces the scattered print diagnostics."""
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
@@ -0,0 +1,335 @@
+"""
+Speech-to-text for the voice UI.
+
+Clips are transcribed on a background worker pool and the text is cached by
+a hash of the audio content, so a clip that Streamlit hands back on every
+rerun is transcribed once. Jobs for a clip already being transcribed are
+shared instead of queued twice. Each clip goes through the audio front-end
+(services.audio_frontend) first; its speech chunks are transcribed in
+parallel when the backend allows it (faster-whisper) and in order
+otherwise, and the job exposes the transcript of the chunks finished so far.
+
+Two Whisper backends are supported:
+  - faster-whisper  CTranslate2 models, int8-quantized on CPU by default
+  - openai-whisper  the reference PyTorch models, fp32 on CPU
+WHISPER_BACKEND=auto picks faster-whisper when it is installed.
+
+Usage:
+    python -m services.transcription benchmark --sizes tiny base small [clip.wav ...]
+"""
+import argparse
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import numpy as np
+from constants.resources import lazy_resource
+from services.audio_frontend import SAMPLE_RATE, decode_audio, prepare_audio, resample, to_mono
+from dotenv import load_dotenv
+load_dotenv()
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+try:
+    import whisper
+except ImportError:
+    whisper = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("faster-whisper", "openai-whisper")
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "auto")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")  # tiny/base/small/medium/large
+# faster-whisper only: int8, int8_float32, float32, ...
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+# faster-whisper only: 0 lets CTranslate2 decide
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", "2"))
+TRANSCRIPTION_CACHE_SIZE = int(os.getenv("TRANSCRIPTION_CACHE_SIZE", "256"))
+
+
+class FasterWhisperBackend:
+    """CTranslate2 Whisper; reports progress as the decoded segments advance."""
+
+    name = "faster-whisper"
+    # Chunks of one clip may be transcribed in parallel
+    concurrent = True
+
+    def __init__(self, size: str, compute_type: str = WHISPER_COMPUTE_TYPE,
+                 cpu_threads: int = WHISPER_CPU_THREADS, workers: int = TRANSCRIPTION_WORKERS):
+        if WhisperModel is None:
+            raise RuntimeError("faster-whisper is not installed")
+        self.size = size
+        self.compute_type = compute_type
+        # num_workers lets the pool's threads transcribe in parallel on one model
+        self.model = WhisperModel(size, device="cpu", compute_type=compute_type,
+                                  cpu_threads=cpu_threads, num_workers=max(workers, 1))
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}/{self.size}/{self.compute_type}"
+
+    def transcribe(self, audio: np.ndarray, on_progress=None) -> str:
+        segments, info = self.model.transcribe(audio, beam_size=1)
+        texts = []
+        for segment in segments:
+            texts.append(segment.text)
+            if on_progress is not None and info.duration:
+                on_progress(min(segment.end / info.duration, 1.0))
+        return "".join(texts).strip()
+
+
+class OpenAIWhisperBackend:
+    """
+    Reference PyTorch Whisper; cannot report progress. Its decoder installs
+    kv-cache hooks on the shared model, so calls are serialized.
+    """
+
+    name = "openai-whisper"
+    concurrent = False
+
+    def __init__(self, size: str):
+        if whisper is None:
+            raise RuntimeError("openai-whisper is not installed")
+        self.size = size
+        self.compute_type = "float32"
+        self.model = whisper.load_model(size, device="cpu")
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}/{self.size}"
+
+    def transcribe(self, audio: np.ndarray, on_progress=None) -> str:
+        with self._lock:
+            return self.model.transcribe(audio, fp16=False)["text"].strip()
+
+
+def resolve_backend(backend: str = WHISPER_BACKEND) -> str:
+    if backend == "auto":
+        return "faster-whisper" if WhisperModel is not None else "openai-whisper"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown WHISPER_BACKEND {backend!r}, expected auto or one of {BACKENDS}")
+    return backend
+
+
+def load_backend(backend: str = WHISPER_BACKEND, size: str = WHISPER_MODEL, compute_type: str = WHISPER_COMPUTE_TYPE):
+    if resolve_backend(backend) == "faster-whisper":
+        return FasterWhisperBackend(size, compute_type)
+    return OpenAIWhisperBackend(size)
+
+
+@lazy_resource("whisper_model")
+def get_whisper_backend():
+    return load_backend()
+
+
+class TranscriptionJob:
+    """A clip's transcription: done at once on a cache hit, else running on the pool."""
+
+    def __init__(self, key: str, future: Future):
+        self.key = key
+        self.future = future
+        # Per chunk, in audio order: transcript once finished, and fraction decoded
+        self.partials = []
+        self.chunk_progress = []
+
+    def start(self, chunks: int):
+        self.partials = [None] * chunks
+        self.chunk_progress = [0.0] * chunks
+
+    @property
+    def progress(self) -> float | None:
+        """Fraction of the clip transcribed, None until its chunks are known."""
+        if self.done():
+            return 1.0
+        if not self.chunk_progress:
+            return None
+        return sum(self.chunk_progress) / len(self.chunk_progress)
+
+    def partial_text(self) -> str:
+        """Transcript of the leading chunks finished so far."""
+        texts = []
+        for text in self.partials:
+            if text is None:
+                break
+            texts.append(text)
+        return " ".join(t for t in texts if t)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the job is done or `timeout` passes; True when done."""
+        wait([self.future], timeout)
+        return self.done()
+
+    def result(self, timeout: float = None) -> str:
+        return self.future.result(timeout)
+
+
+class TranscriptionService:
+    """
+    Transcribes clips on a worker pool, with an LRU cache of text keyed by
+    the audio's SHA-256, and one shared job per clip in flight.
+    """
+
+    def __init__(self, backend_factory=get_whisper_backend, workers: int = TRANSCRIPTION_WORKERS,
+                 cache_size: int = TRANSCRIPTION_CACHE_SIZE):
+        self.backend_factory = backend_factory
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="transcribe")
+        self._chunk_pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="transcribe-chunk")
+
+    @staticmethod
+    def audio_key(audio_bytes: bytes) -> str:
+        return hashlib.sha256(audio_bytes).hexdigest()
+
+    def submit(self, audio_bytes: bytes) -> TranscriptionJob:
+        key = self.audio_key(audio_bytes)
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                future = Future()
+                future.set_result(text)
+                job = TranscriptionJob(key, future)
+                job.partials = [text]
+                return job
+            job = self._pending.get(key)
+            if job is not None:
+                return job
+            self.misses += 1
+            job = TranscriptionJob(key, None)
+            job.future = self._pool.submit(self._run, job, audio_bytes)
+            self._pending[key] = job
+        return job
+
+    def transcribe(self, audio_bytes: bytes, timeout: float = None) -> str:
+        return self.submit(audio_bytes).result(timeout)
+
+    def _run(self, job: TranscriptionJob, audio_bytes: bytes) -> str:
+        try:
+            start = time.perf_counter()
+            prepared = prepare_audio(audio_bytes)
+            job.start(len(prepared.chunks))
+            backend = self.backend_factory() if prepared.chunks else None
+            if getattr(backend, "concurrent", False) and len(prepared.chunks) > 1:
+                futures = [
+                    self._chunk_pool.submit(self._transcribe_chunk, backend, job, i, chunk)
+                    for i, chunk in enumerate(prepared.chunks)
+                ]
+                texts = [f.result() for f in futures]
+            else:
+                # In order on this thread, so partial transcripts still grow chunk by chunk
+                texts = [self._transcribe_chunk(backend, job, i, chunk) for i, chunk in enumerate(prepared.chunks)]
+            text = " ".join(t for t in texts if t)
+            logger.info("🎧 Transcribed %.1fs of speech (%.1fs recorded, %d chunks) in %.2fs",
+                        prepared.speech_seconds, prepared.duration, len(texts), time.perf_counter() - start)
+        except Exception:
+            with self._lock:
+                self._pending.pop(job.key, None)
+            raise
+        with self._lock:
+            self._pending.pop(job.key, None)
+            self._cache[job.key] = text
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    @staticmethod
+    def _transcribe_chunk(backend, job: TranscriptionJob, index: int, chunk: np.ndarray) -> str:
+        def on_progress(fraction: float):
+            job.chunk_progress[index] = fraction
+
+        text = backend.transcribe(chunk, on_progress=on_progress)
+        job.partials[index] = text
+        job.chunk_progress[index] = 1.0
+        return text
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._cache), "pending": len(self._pending), "hits": self.hits, "misses": self.misses}
+
+
+transcriber = TranscriptionService()
+
+
+def benchmark_rtf(clips: list, backends=BACKENDS, sizes=("tiny", "base", "small"),
+                  compute_type: str = WHISPER_COMPUTE_TYPE, repeats: int = 3) -> list:
+    """
+    Real-time factor (transcription seconds per audio second, lower is
+    faster) of every backend and model size on 16 kHz mono `clips`.
+    Backends that are not installed are skipped.
+    """
+    audio_seconds = sum(len(clip) for clip in clips) / SAMPLE_RATE
+    results = []
+    for backend in backends:
+        for size in sizes:
+            start = time.perf_counter()
+            try:
+                model = load_backend(backend, size, compute_type)
+            except RuntimeError as e:
+                logger.warning("Skipping %s: %s", backend, e)
+                break
+            load_s = time.perf_counter() - start
+            for clip in clips:
+                model.transcribe(clip)  # warm-up
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                for clip in clips:
+                    model.transcribe(clip)
+                timings.append(time.perf_counter() - start)
+            seconds = float(np.median(timings))
+            results.append({
+                "backend": backend, "size": size, "compute_type": model.compute_type,
+                "load_s": load_s, "audio_s": audio_seconds, "transcribe_s": seconds, "rtf": seconds / audio_seconds,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("benchmark", help="Report the real-time factor per backend and model size")
+    bench.add_argument("clips", nargs="*", help="Audio files (default: 20s of synthetic audio)")
+    bench.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    bench.add_argument("--sizes", nargs="+", default=["tiny", "base", "small"])
+    bench.add_argument("--compute-type", default=WHISPER_COMPUTE_TYPE)
+    bench.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.clips:
+        clips = []
+        for path in args.clips:
+            with open(path, "rb") as f:
+                audio, sample_rate = decode_audio(f.read())
+            clips.append(resample(to_mono(audio), sample_rate))
+    else:
+        # Speech-band tone bursts over low noise
+        t = np.arange(20 * SAMPLE_RATE) / SAMPLE_RATE
+        envelope = (np.sin(2 * np.pi * 2 * t) > 0).astype(np.float32)
+        noise = np.random.default_rng(0).normal(0, 0.01, t.size)
+        clips = [(0.1 * envelope * np.sin(2 * np.pi * 220 * t) + noise).astype(np.float32)]
+
+    print(f"{'backend':<16} {'size':<8} {'compute':<10} {'load s':>7} {'audio s':>8} {'RTF':>7}")
+    for r in benchmark_rtf(clips, args.backends, args.sizes, args.compute_type, args.repeats):
+        print(f"{r['backend']:<16} {r['size']:<8} {r['compute_type']:<10} {r['load_s']:>7.2f} "
+              f"{r['audio_s']:>8.1f} {r['rtf']:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Build, load and benchmark the article FAISS index.
+
+An index directory written by `build_index` holds:
+  - index.faiss      the raw FAISS index (flat, IVF, HNSW, PQ or IVF-PQ)
+  - docstore.jsonl   one {"id", "page_content", "metadata"} record per vector, in index order
+  - index_meta.json  index kind, factory string, dimension and size
+  - VERSION          stamp rewritten last on every write, watched by running servers
+
+The index is memory-mapped read-only where FAISS supports it, so processes
+share the page cache instead of each unpickling a private copy. Directories
+without index_meta.json are legacy LangChain pickles and are still loaded.
+
+Usage:
+    python -m services.vector_index convert --kind hnsw --out faiss_index_hnsw
+    python -m services.vector_index benchmark --kinds flat ivf hnsw pq ivfpq
+"""
+import argparse
+import json
+import math
+import os
+import time
+import faiss
+import numpy as np
+from langchain.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+from dotenv import load_dotenv
+load_dotenv()
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.jsonl"
+META_FILE = "index_meta.json"
+VERSION_FILE = "VERSION"
+
+INDEX_KINDS = ("flat", "ivf", "hnsw", "pq", "ivfpq")
+FAISS_INDEX_KIND = os.getenv("FAISS_INDEX_KIND", "flat")
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+FAISS_MMAP = os.getenv("FAISS_MMAP", "true").lower() == "true"
+
+
+def factory_string(kind: str, dim: int, count: int) -> str:
+    """FAISS index_factory description for an index kind sized to the corpus."""
+    nlist = max(1, min(int(4 * math.sqrt(max(count, 1))), count // 39 or 1))
+    # At least 8 dimensions per PQ sub-quantizer, and fewer centroids per
+    # sub-quantizer on corpora too small to train 256 of them.
+    pq_m = next(m for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1) if dim % m == 0 and m <= max(dim // 8, 1))
+    pq_bits = 8 if count >= 256 * 39 else 4
+    if kind == "flat":
+        return "Flat"
+    if kind == "ivf":
+        return f"IVF{nlist},Flat"
+    if kind == "hnsw":
+        return "HNSW32"
+    if kind == "pq":
+        return f"PQ{pq_m}x{pq_bits}"
+    if kind == "ivfpq":
+        return f"IVF{nlist},PQ{pq_m}x{pq_bits}"
+    raise ValueError(f"Unknown index kind {kind!r}; expected one of {INDEX_KINDS}")
+
+
+def create_index(vectors: np.ndarray, kind: str):
+    """Create, train and fill a FAISS index of the given kind."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    spec = factory_string(kind, vectors.shape[1], len(vectors))
+    index = faiss.index_factory(vectors.shape[1], spec, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index, spec
+
+
+def tune_index(index):
+    """Apply the configured search-time parameters for the index kind."""
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", FAISS_NPROBE), ("efSearch", FAISS_EF_SEARCH)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            continue
+    return index
+
+
+def search_params(index, selector):
+    """
+    Search parameters restricting a search to the selected vector positions,
+    of the type the index expects and keeping its configured nprobe/efSearch.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def _replace_file(path: str, write):
+    """Write a file next to `path` and atomically move it into place."""
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_index(path: str, index, documents: list, kind: str, spec: str, version: str = None) -> str:
+    """
+    Write the index, its JSONL docstore and metadata to `path`, each file
+    atomically, and bump VERSION last so running servers reload only after
+    every file is in place. A None document marks a dropped vector.
+
+    Returns:
+        str: The version written.
+    """
+    version = version or str(time.time_ns())
+    os.makedirs(path, exist_ok=True)
+
+    def write_docstore(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for doc_id, doc in documents:
+                if doc is None:
+                    f.write(json.dumps({"id": None}) + "\n")
+                    continue
+                f.write(json.dumps({"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}) + "\n")
+
+    def write_meta(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump({"kind": kind, "spec": spec, "dim": index.d, "count": index.ntotal}, f, indent=4)
+
+    def write_version(tmp_path):
+        with open(tmp_path, "w") as f:
+            f.write(version)
+
+    _replace_file(os.path.join(path, INDEX_FILE), lambda tmp: faiss.write_index(index, tmp))
+    _replace_file(os.path.join(path, DOCSTORE_FILE), write_docstore)
+    _replace_file(os.path.join(path, META_FILE), write_meta)
+    _replace_file(os.path.join(path, VERSION_FILE), write_version)
+    return version
+
+
+def index_version(path: str) -> str:
+    """Version stamp of the index directory; changes whenever it is rewritten."""
+    try:
+        with open(os.path.join(path, VERSION_FILE)) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def read_meta(path: str) -> dict:
+    """index_meta.json of an index directory; legacy pickled indexes are flat."""
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"kind": "flat", "spec": "Flat"}
+
+
+def build_index(path: str, documents: list, embeddings, kind: str = FAISS_INDEX_KIND, batch_size: int = 256):
+    """Embed `documents` in batches and write a new index of `kind` to `path`."""
+    vectors = []
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        vectors.extend(embeddings.embed_documents([d.page_content for d in batch]))
+    index, spec = create_index(np.array(vectors, dtype=np.float32), kind)
+    write_index(path, index, [(str(i), d) for i, d in enumerate(documents)], kind, spec)
+    return index
+
+
+def read_index(path: str, mmap: bool = FAISS_MMAP):
+    """Read index.faiss, memory-mapped read-only when the index type allows it."""
+    index_file = os.path.join(path, INDEX_FILE)
+    if mmap:
+        try:
+            return faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    return faiss.read_index(index_file)
+
+
+def load_index(path: str, embeddings, mmap: bool = FAISS_MMAP) -> FAISS:
+    """
+    Load an index directory as a LangChain FAISS store. Legacy pickled
+    directories (no index_meta.json) go through FAISS.load_local.
+    """
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return FAISS.load_local(path, embeddings=embeddings, allow_dangerous_deserialization=True)
+
+    index = tune_index(read_index(path, mmap))
+    docs = {}
+    index_to_docstore_id = {}
+    with open(os.path.join(path, DOCSTORE_FILE), encoding="utf-8") as f:
+        for position, line in enumerate(f):
+            record = json.loads(line)
+            if record["id"] is None:
+                continue
+            docs[record["id"]] = Document(page_content=record["page_content"], metadata=record["metadata"])
+            index_to_docstore_id[position] = record["id"]
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(docs),
+        index_to_docstore_id=index_to_docstore_id,
+    )
+
+
+def store_documents(store: FAISS) -> list:
+    """(id, Document) pairs of a loaded store in index order; None for dropped vectors."""
+    documents = []
+    for position in range(store.index.ntotal):
+        doc_id = store.index_to_docstore_id.get(position)
+        documents.append((str(doc_id), store.docstore.search(doc_id) if doc_id is not None else None))
+    return documents
+
+
+def export_store(store: FAISS):
+    """Vectors and (id, Document) pairs of a loaded store, in index order."""
+    return store.index.reconstruct_n(0, store.index.ntotal), store_documents(store)
+
+
+def convert_index(src: str, dst: str, embeddings, kind: str):
+    """Rebuild an existing (possibly legacy pickled) flat index as `kind` without re-embedding."""
+    vectors, documents = export_store(load_index(src, embeddings, mmap=False))
+    index, spec = create_index(vectors, kind)
+    write_index(dst, index, documents, kind, spec)
+    return index
+
+
+def benchmark_index(vectors: np.ndarray, kinds=INDEX_KINDS, queries: int = 200, k: int = 5, seed: int = 0) -> list:
+    """
+    Compare index kinds on the same vectors against exact flat search.
+
+    Query vectors are sampled from the corpus and perturbed slightly.
+
+    Returns:
+        list: One dict per kind with recall@k, p50/p99 latency (ms) and build time.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)]
+    query_vectors = sample + rng.normal(0, 0.01, sample.shape).astype(np.float32)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(query_vectors, k)
+
+    results = []
+    for kind in kinds:
+        start = time.perf_counter()
+        index, spec = create_index(vectors, kind)
+        tune_index(index)
+        build_seconds = time.perf_counter() - start
+
+        latencies = []
+        hits = 0
+        for i, query in enumerate(query_vectors):
+            start = time.perf_counter()
+            _, found = index.search(query.reshape(1, -1), k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(set(found[0]) & set(truth[i]))
+        results.append({
+            "kind": kind,
+            "spec": spec,
+            f"recall@{k}": hits / (len(query_vectors) * k),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "build_s": build_seconds,
+        })
+    return results
+
+
+def main():
+    from services.mongo_tool import FAISS_PATH
+    from services.embedding_service import embeddings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Rebuild the index as another kind")
+    convert.add_argument("--src", default=FAISS_PATH)
+    convert.add_argument("--out", required=True)
+    convert.add_argument("--kind", choices=INDEX_KINDS, default=FAISS_INDEX_KIND)
+    bench = sub.add_parser("benchmark", help="Report recall and latency per index kind")
+    bench.add_argument("--src", default=FAISS_PATH)
+    bench.add_argument("--kinds", nargs="+", choices=INDEX_KINDS, default=list(INDEX_KINDS))
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--synthetic", type=int, default=0,
+                       help="Benchmark on this many random 768-d vectors instead of the index at --src")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        index = convert_index(args.src, args.out, embeddings, args.kind)
+        print(f"✅ Wrote {args.kind} index with {index.ntotal} vectors to {args.out}")
+        return
+
+    if args.synthetic:
+        vectors = np.random.default_rng(1).normal(size=(args.synthetic, 768)).astype(np.float32)
+    else:
+        vectors, _ = export_store(load_index(args.src, embeddings, mmap=False))
+    print(f"{'kind':<7} {'spec':<18} {'recall@5':>9} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}")
+    for r in benchmark_index(vectors, args.kinds, args.queries):
+        print(f"{r['kind']:<7} {r['spec']:<18} {r['recall@5']:>9.3f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['build_s']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()